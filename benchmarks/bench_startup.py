@@ -0,0 +1,112 @@
+# Đo thời gian khởi động của Sổ tay TOEIC (import lõi + khung hình đầu tiên của giao diện).
+# python benchmarks/bench_startup.py --runs 5 --output startup.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_TOP_N = 15
+FIRST_FRAME_TIMEOUT = 30
+
+def parse_importtime(stderr, top=IMPORT_TOP_N):
+    """Đọc output của `python -X importtime`, trả về các module tốn thời gian nhất (ms, cộng dồn)."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # dòng tiêu đề
+        modules.append({
+            "module": parts[2].strip(),
+            "self_ms": self_us / 1000,
+            "cumulative_ms": cumulative_us / 1000,
+        })
+    modules.sort(key=lambda m: m["cumulative_ms"], reverse=True)
+    return modules[:top]
+
+def measure_import(module):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1:] or ["import failed"]}
+    return {"wall_ms": wall * 1000, "top_imports": parse_importtime(proc.stderr)}
+
+def measure_first_frame():
+    """Chạy uk_dict.py với UK_DICT_STARTUP_PROBE; cửa sổ tự đóng sau khung hình đầu tiên."""
+    env = dict(os.environ, UK_DICT_STARTUP_PROBE="1")
+    start = time.perf_counter()
+    try:
+        proc = subprocess.run(
+            [sys.executable, "uk_dict.py"],
+            cwd=ROOT, env=env, capture_output=True, text=True, timeout=FIRST_FRAME_TIMEOUT,
+        )
+    except subprocess.TimeoutExpired:
+        return {"error": "timeout"}
+    wall = time.perf_counter() - start
+    for line in proc.stdout.splitlines():
+        if line.startswith("FIRST_FRAME "):
+            return {
+                "wall_ms": wall * 1000,
+                "in_process_ms": float(line.split()[1]) * 1000,
+            }
+    lines = proc.stderr.strip().splitlines()
+    return {"error": lines[-1] if lines else f"exit code {proc.returncode}"}
+
+def summarize(samples, key):
+    values = [s[key] for s in samples if key in s]
+    if not values:
+        return None
+    return {
+        "min": min(values),
+        "median": statistics.median(values),
+        "max": max(values),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đo thời gian khởi động (import + khung hình đầu tiên).")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--no-gui", action="store_true", help="Bỏ qua đo khung hình đầu tiên (máy không có màn hình)")
+    parser.add_argument("--output", help="Ghi kết quả JSON ra file thay vì stdout")
+    args = parser.parse_args(argv)
+
+    import_runs = [measure_import("uk_core") for _ in range(args.runs)]
+    result = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_uk_core": {
+            "wall_ms": summarize(import_runs, "wall_ms"),
+            "top_imports": import_runs[-1].get("top_imports", []),
+            "errors": [r["error"] for r in import_runs if "error" in r],
+        },
+    }
+    if not args.no_gui:
+        frame_runs = [measure_first_frame() for _ in range(args.runs)]
+        result["first_frame"] = {
+            "wall_ms": summarize(frame_runs, "wall_ms"),
+            "in_process_ms": summarize(frame_runs, "in_process_ms"),
+            "errors": [r["error"] for r in frame_runs if "error" in r],
+        }
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+# Benchmark tra từ / dịch / flashcard với API và bộ dịch giả (không cần mạng).
+# python benchmarks/bench_suite.py --output bench_results.json --baseline old_results.json
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from stub_api import FakeTranslator, start_stub_api
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_OUTPUT = "bench_results.json"
+REGRESSION_THRESHOLD = 0.10     # chậm hơn baseline quá 10% thì báo
+FLASHCARD_SIZES = (100, 1000, 10000)
+FLASHCARD_OPS = 50              # số lần lưu / xóa đo ở mỗi kích thước
+
+def summarize(seconds):
+    """Thống kê theo mili giây."""
+    ms = sorted(s * 1000 for s in seconds)
+    if not ms:
+        return None
+    return {
+        "n": len(ms),
+        "mean": statistics.fmean(ms),
+        "p50": ms[len(ms) // 2],
+        "p95": ms[min(len(ms) - 1, int(len(ms) * 0.95))],
+        "min": ms[0],
+        "max": ms[-1],
+    }
+
+def bench_lookup(core, iterations, prefix):
+    """Độ trễ lookup_meaning (cache lạnh rồi cache nóng) và các mốc hiển thị như giao diện:
+    định nghĩa đầu tiên (tiếng Anh), bản dịch đầu tiên, bản dịch cuối cùng.
+    """
+    cold, warm, first_def, first_vi, last_vi = [], [], [], [], []
+    words = [f"{prefix}{i}" for i in range(iterations)]
+    for word in words:
+        start = time.perf_counter()
+        core.lookup_meaning(word)
+        cold.append(time.perf_counter() - start)
+    for word in words:
+        start = time.perf_counter()
+        core.lookup_meaning(word)
+        warm.append(time.perf_counter() - start)
+
+    # Mô phỏng luồng của uk_dict.lookup_meaning: hiện tiếng Anh trước, bản dịch về dần
+    for word in (f"{prefix}ui{i}" for i in range(iterations)):
+        marks = {}
+        start = time.perf_counter()
+        data = core.fetch_api(word, core.API_URL_DICT, core.DICTIONARY_KEY)
+        texts = [d for e in core.parse_meaning(data) for d in e.get("definitions", [])]
+        first_def.append(time.perf_counter() - start)
+
+        def on_result(i, vi):
+            now = time.perf_counter() - start
+            marks.setdefault("first", now)
+            marks["last"] = now
+        core.translate_batch(texts, on_result=on_result)
+        if marks:
+            first_vi.append(marks["first"])
+            last_vi.append(marks["last"])
+
+    return {
+        "lookup_meaning_cold_ms": summarize(cold),
+        "lookup_meaning_warm_ms": summarize(warm),
+        "time_to_first_definition_ms": summarize(first_def),
+        "time_to_first_translation_ms": summarize(first_vi),
+        "time_to_last_translation_ms": summarize(last_vi),
+    }
+
+def bench_translation(core, translator, texts_count, prefix):
+    texts = [f"{prefix} sentence number {i} about business meetings and quarterly reports"
+             for i in range(texts_count)]
+    calls_before = translator.calls
+    start = time.perf_counter()
+    core.translate_batch(texts)
+    elapsed = time.perf_counter() - start
+    return {
+        "texts": texts_count,
+        "seconds": elapsed,
+        "texts_per_second": texts_count / elapsed if elapsed else None,
+        "chars_per_second": sum(map(len, texts)) / elapsed if elapsed else None,
+        "translator_calls": translator.calls - calls_before,
+    }
+
+def bench_flashcards(core, workdir, sizes, ops):
+    """Lưu / xóa từng thẻ và thời gian mở trình quản lý (nạp toàn bộ thẻ, không tính vẽ Tk)."""
+    results = {}
+    for size in sizes:
+        legacy_json = os.path.join(workdir, f"cards_{size}.json")
+        db_path = os.path.join(workdir, f"cards_{size}.db")
+        with open(legacy_json, "w", encoding="utf-8") as f:
+            json.dump({f"word{i}": f"nghĩa số {i}" for i in range(size)}, f, ensure_ascii=False)
+        core.FlashcardStore(db_path, legacy_json=legacy_json)   # chuyển dữ liệu một lần = dựng bộ thẻ
+
+        opens = []
+        for _ in range(5):
+            start = time.perf_counter()
+            store = core.FlashcardStore(db_path, legacy_json=None)
+            items = list(store.load_all().items())
+            opens.append(time.perf_counter() - start)
+        assert len(items) == size
+
+        saves, deletes = [], []
+        for i in range(ops):
+            start = time.perf_counter()
+            store.add(f"bench{i}", "nghĩa mới")
+            saves.append(time.perf_counter() - start)
+        for i in range(ops):
+            start = time.perf_counter()
+            store.delete(f"bench{i}")
+            deletes.append(time.perf_counter() - start)
+
+        results[str(size)] = {
+            "manager_open_ms": summarize(opens),
+            "save_ms": summarize(saves),
+            "delete_ms": summarize(deletes),
+        }
+    return results
+
+def flatten(result, prefix=""):
+    """{"a": {"p50": 1}} -> {"a.p50": 1}, chỉ giữ các số (để so với baseline)."""
+    flat = {}
+    for key, value in result.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+def compare(result, baseline, threshold=REGRESSION_THRESHOLD):
+    """So các chỉ số p50 / seconds với baseline; trả về danh sách chậm đi quá ngưỡng."""
+    current, previous = flatten(result), flatten(baseline)
+    regressions = []
+    for path, value in current.items():
+        if not (path.endswith(".p50") or path.endswith(".seconds")):
+            continue
+        old = previous.get(path)
+        if old and value > old * (1 + threshold):
+            regressions.append({"metric": path, "baseline": old, "current": value,
+                                "change": value / old - 1})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark tra từ, dịch và flashcard với API / bộ dịch giả.")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--api-latency", type=float, default=0.05, help="Giây, độ trễ của API giả")
+    parser.add_argument("--entries", type=int, default=3, help="Số mục mỗi phản hồi (kích thước payload)")
+    parser.add_argument("--definitions", type=int, default=3, help="Số định nghĩa mỗi mục")
+    parser.add_argument("--translate-latency", type=float, default=0.1, help="Giây, độ trễ mỗi lần gọi bộ dịch giả")
+    parser.add_argument("--translate-texts", type=int, default=200)
+    parser.add_argument("--card-sizes", type=int, nargs="+", default=list(FLASHCARD_SIZES))
+    parser.add_argument("--output", "-o", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", help="File kết quả cũ để so sánh")
+    args = parser.parse_args(argv)
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    # Chạy trong thư mục tạm để không đụng vào cache / flashcard thật (cache / flashcard nằm ở đường dẫn tương đối)
+    workdir = tempfile.mkdtemp(prefix="uk_bench_")
+    os.chdir(workdir)
+    import uk_core as core
+
+    server, base_url = start_stub_api(latency=args.api_latency, entries=args.entries,
+                                      definitions=args.definitions)
+    core.set_api_base(base_url)
+    translator = FakeTranslator(latency=args.translate_latency)
+    core.set_translator(translator)
+    prefix = f"w{int(time.time())}"   # từ mới mỗi lần chạy => cache luôn lạnh
+
+    result = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "config": vars(args),
+        "lookup": bench_lookup(core, args.iterations, prefix),
+        "translation": bench_translation(core, translator, args.translate_texts, prefix),
+        "flashcards": bench_flashcards(core, workdir, args.card_sizes, FLASHCARD_OPS),
+        "api_requests": server.requests,
+        "translator_calls": translator.calls,
+    }
+    server.shutdown()
+
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            result["regressions"] = compare(result, json.load(f))
+        for r in result["regressions"]:
+            print(f"⚠️ {r['metric']}: {r['baseline']:.2f} -> {r['current']:.2f} (+{r['change']:.0%})",
+                  file=sys.stderr)
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"Đã ghi kết quả vào {output}", file=sys.stderr)
+    return 1 if result.get("regressions") else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# Server giả lập dictionaryapi.com và bộ dịch giả, dùng cho benchmark / test không cần mạng.
+# python benchmarks/stub_api.py --port 9000 --latency 0.1
+# python uk_core.py serve --api-base http://127.0.0.1:9000
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_LATENCY = 0.05         # giây, độ trễ trung bình mỗi request
+STUB_JITTER = 0.2           # ±20% độ trễ
+STUB_ENTRIES = 3            # số mục trong mỗi phản hồi
+STUB_DEFINITIONS = 3        # số shortdef mỗi mục
+STUB_DEFINITION_WORDS = 12  # số từ mỗi định nghĩa (điều chỉnh kích thước payload)
+
+FILLER = ("to move quickly on foot so that both feet leave the ground during each stride "
+          "a continuous series of performances or events in a particular place").split()
+
+def make_entries(word, endpoint, entries=STUB_ENTRIES, definitions=STUB_DEFINITIONS,
+                 definition_words=STUB_DEFINITION_WORDS):
+    """Phản hồi giống cấu trúc của Merriam-Webster (meta / hwi / fl / shortdef)."""
+    data = []
+    for i in range(entries):
+        defs = []
+        for j in range(definitions):
+            body = " ".join(FILLER[(i + j + k) % len(FILLER)] for k in range(definition_words))
+            defs.append(f"{word} {i}.{j}: {body}")
+        entry = {
+            "meta": {"id": f"{word}:{i + 1}", "stems": [word, f"{word}s", f"{word}ing"]},
+            "hwi": {"hw": word},
+            "fl": ("noun", "verb", "adjective")[i % 3],
+            "shortdef": defs,
+        }
+        if endpoint == "thesaurus":
+            entry["meta"]["syns"] = [[f"{word}-syn{k}" for k in range(5)]]
+            entry["meta"]["ants"] = [[f"{word}-ant{k}" for k in range(3)]]
+        data.append(entry)
+    return data
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    """GET /api/v3/references/{collegiate|thesaurus}/json/<từ>?key=..."""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parts = [urllib.parse.unquote(p) for p in urllib.parse.urlsplit(self.path).path.split("/") if p]
+        server = self.server
+        with server.stats_lock:
+            server.requests += 1
+        if server.latency:
+            time.sleep(server.latency * (1 + random.uniform(-STUB_JITTER, STUB_JITTER)))
+        if len(parts) != 6 or parts[:3] != ["api", "v3", "references"] or parts[4] != "json":
+            return self._send(404, {"error": "not found"})
+        self._send(200, make_entries(parts[5], parts[3], server.entries, server.definitions,
+                                     server.definition_words))
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_api(host="127.0.0.1", port=0, latency=STUB_LATENCY, entries=STUB_ENTRIES,
+                   definitions=STUB_DEFINITIONS, definition_words=STUB_DEFINITION_WORDS):
+    """Chạy server giả ở thread nền, trả về (server, base_url). server.requests đếm số request nhận được."""
+    server = ThreadingHTTPServer((host, port), StubApiHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.entries = entries
+    server.definitions = definitions
+    server.definition_words = definition_words
+    server.requests = 0
+    server.stats_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+class FakeTranslator:
+    """Bộ dịch giả thay GoogleTranslator: trễ cố định + theo số ký tự, giữ nguyên số dòng khi dịch gộp."""
+
+    def __init__(self, latency=0.1, per_char=0.00002):
+        self.latency = latency
+        self.per_char = per_char
+        self.calls = 0
+        self.chars = 0
+        self._lock = threading.Lock()
+
+    def translate(self, text):
+        with self._lock:
+            self.calls += 1
+            self.chars += len(text)
+        time.sleep(self.latency + self.per_char * len(text))
+        return "\n".join(f"[vi] {line}" for line in text.split("\n"))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Server giả lập dictionaryapi.com.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=STUB_LATENCY)
+    parser.add_argument("--entries", type=int, default=STUB_ENTRIES)
+    parser.add_argument("--definitions", type=int, default=STUB_DEFINITIONS)
+    parser.add_argument("--definition-words", type=int, default=STUB_DEFINITION_WORDS)
+    args = parser.parse_args(argv)
+
+    server, base_url = start_stub_api(args.host, args.port, args.latency, args.entries,
+                                      args.definitions, args.definition_words)
+    print(f"Stub API tại {base_url} (Ctrl+C để dừng)", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
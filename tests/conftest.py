@@ -0,0 +1,57 @@
+# Fixture dùng chung: mỗi test chạy trong thư mục tạm, API thật được thay bằng benchmarks/stub_api.py
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+import uk_core as core  # noqa: E402
+from stub_api import start_stub_api, FakeTranslator  # noqa: E402
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Thư mục tạm với cache, flashcard và từ điển offline mới (uk_core dùng đường dẫn tương đối)."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(core, "_response_cache", None)
+    monkeypatch.setattr(core, "_translation_cache", None)
+    monkeypatch.setattr(core, "_flashcard_store", None)
+    monkeypatch.setattr(core, "api_client", core.ApiClient(max_retries=0))
+    core.reset_offline_dicts()
+    yield tmp_path
+    core.reset_offline_dicts()
+
+
+@pytest.fixture
+def translator(monkeypatch):
+    """Bộ dịch giả không trễ; translator.calls đếm số request dịch."""
+    fake = FakeTranslator(latency=0, per_char=0)
+    monkeypatch.setattr(core, "_translator", fake)
+    return fake
+
+
+@pytest.fixture
+def stub_api(workdir, monkeypatch):
+    """dictionaryapi.com giả; stub_api.requests đếm số request nhận được."""
+    pytest.importorskip("requests")
+    server, base_url = start_stub_api(latency=0.05)
+    # set_api_base sửa URL toàn cục: monkeypatch trả lại URL gốc sau mỗi test
+    monkeypatch.setattr(core, "API_URL_DICT", core.API_URL_DICT)
+    monkeypatch.setattr(core, "API_URL_THES", core.API_URL_THES)
+    core.set_api_base(base_url)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def lookup_server(workdir):
+    """Server tra từ (uk_core serve) ở cổng trống; trả về (host, port)."""
+    server = core.make_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[:2]
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+import uk_core as core
+
+ESSAY = "First paragraph.\n\nSecond paragraph.\nThird paragraph."
+PARAGRAPHS = ["First paragraph.", "Second paragraph.", "Third paragraph."]
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    fresh = core.Tracer()
+    monkeypatch.setattr(core, "tracer", fresh)
+    return fresh
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Pool một worker, hàng đợi một chỗ; pool.gate giữ worker bận cho tới khi được mở."""
+    small = core.WorkerPool(workers=1, max_queue=1)
+    small.gate = threading.Event()
+    started = threading.Event()
+    small.submit(lambda: (started.set(), small.gate.wait(5)))
+    assert started.wait(5)
+    monkeypatch.setattr(core, "worker_pool", small)
+    yield small
+    small.gate.set()
+
+
+def collect():
+    done = {}
+    event = threading.Event()
+
+    def on_paragraph(i, vi):
+        done[i] = vi
+        if len(done) == len(PARAGRAPHS):
+            event.set()
+    return done, event, on_paragraph
+
+
+def spans(tracer):
+    return list(tracer.stages.get("essay.translate", []))
+
+
+def test_cached_essay_needs_no_worker(workdir, translator, tracer, pool):
+    for paragraph in PARAGRAPHS:
+        core.get_translation_cache().put(core.TRANSLATE_SOURCE, core.TRANSLATE_TARGET, paragraph, "vi " + paragraph)
+    done, event, on_paragraph = collect()
+    # Worker duy nhất đang bận: chỉ trả về được nếu không khúc nào phải xếp hàng
+    results = core.translate_essay(ESSAY, on_paragraph=on_paragraph)
+    assert results == ["vi " + p for p in PARAGRAPHS]
+    assert event.is_set() and translator.calls == 0
+    assert len(spans(tracer)) == 1
+
+
+def test_rejected_and_evicted_pieces_are_retried(workdir, translator, tracer, pool):
+    done, event, on_paragraph = collect()
+    core.translate_essay(ESSAY, on_paragraph=on_paragraph, concurrency=2, wait=False)
+    # Khúc đầu chiếm chỗ duy nhất, khúc sau bị từ chối; lượt tra đẩy khúc đầu ra khỏi hàng đợi
+    assert pool.stats()["rejected"] >= 1
+    pool.submit(lambda: None, priority=core.PRIORITY_USER)
+    assert pool.stats()["dropped"] == 1
+    assert done == {} and spans(tracer) == []
+
+    pool.gate.set()
+    assert event.wait(5)
+    assert [done[i] for i in range(len(PARAGRAPHS))] == ["[vi] " + p for p in PARAGRAPHS]
+    for _ in range(100):
+        if spans(tracer):
+            break
+        threading.Event().wait(0.02)
+    span, = spans(tracer)
+    assert span > 0
+
+
+def test_cancel_skips_pending_pieces(workdir, translator, tracer, pool):
+    cancel = core.CancelToken()
+    done, _, on_paragraph = collect()
+    results = []
+    thread = threading.Thread(target=lambda: results.append(
+        core.translate_essay(ESSAY, on_paragraph=on_paragraph, cancel=cancel)))
+    thread.start()
+    cancel.cancel()
+    pool.gate.set()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert results == [PARAGRAPHS]
+    assert done == {} and translator.calls == 0
+    assert spans(tracer) == []
@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+
+import uk_core as core
+
+
+@pytest.fixture
+def store(workdir):
+    return core.FlashcardStore(str(workdir / "cards.db"), str(workdir / "cards.json"))
+
+
+def add_cards(store, count):
+    store.add_many([(f"w{i}", f"m{i}") for i in range(count)])
+
+
+def test_old_schema_is_migrated(workdir):
+    path = str(workdir / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE flashcards (id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                 " word TEXT NOT NULL UNIQUE, meaning TEXT NOT NULL)")
+    conn.execute("INSERT INTO flashcards (word, meaning) VALUES ('apple', 'táo')")
+    conn.commit()
+    conn.close()
+
+    store = core.FlashcardStore(path, str(workdir / "none.json"))
+    card, = store.due_cards(now=0)
+    assert (card.word, card.ease, card.repetitions, card.due) == ("apple", 2.5, 0, 0)
+
+
+def test_sm2_intervals():
+    card = core.Card(1, "a", "b")
+    intervals = [core.sm2_schedule(card, core.GRADE_GOOD, now=0).interval_days for _ in range(3)]
+    assert intervals == [1, 6, 15.0]
+    assert card.due == 15.0 * 86400
+
+    core.sm2_schedule(card, core.GRADE_AGAIN, now=0)
+    assert (card.repetitions, card.interval_days) == (0, 1)
+    assert card.ease >= core.REVIEW_MIN_EASE
+
+
+def test_add_keeps_review_state(store):
+    store.add("apple", "táo")
+    card, = store.due_cards(now=1)
+    store.save_review(core.sm2_schedule(card, core.GRADE_GOOD, now=1))
+    store.add("apple", "quả táo")
+    assert store.load_all() == {"apple": "quả táo"}
+    assert store.count_due(now=2) == 0
+
+
+def test_many_lapses_do_not_end_session_early(store):
+    add_cards(store, 60)
+    session = core.ReviewSession(store, batch_size=50)
+    now = session.started
+    for _ in range(50):
+        session.answer(session.next_card(now), core.GRADE_AGAIN, now)
+    assert session.remaining() == 60
+    assert session.relearn_pending() == 50
+
+    seen = []
+    while (card := session.next_card(now)) is not None:
+        seen.append(card.word)
+        session.answer(card, core.GRADE_GOOD, now)
+    assert len(seen) == 10
+    assert session.remaining() == 50
+
+    # Thẻ sai được hỏi lại khi tới giờ
+    later = now + core.REVIEW_RELEARN_SECONDS + 1
+    while (card := session.next_card(later)) is not None:
+        session.answer(card, core.GRADE_GOOD, later)
+    assert session.remaining() == 0
+    assert session.reviewed == 110
+
+
+def test_import_export_round_trip(store, workdir, translator):
+    source = workdir / "vocab.csv"
+    source.write_text("word,meaning\napple,táo\nbook,\nApple,trùng\n\"run, fast\",chạy nhanh\n", encoding="utf-8")
+    stats = core.import_flashcards(str(source), store=store)
+    assert stats == {"rows": 4, "added": 3, "duplicates": 1, "translated": 1, "untranslated": 0}
+    assert store.load_all() == {"apple": "táo", "book": "[vi] book", "run, fast": "chạy nhanh"}
+
+    for name in ("out.csv", "out.txt"):
+        assert core.export_flashcards(str(workdir / name), store) == 3
+        assert list(core.read_flashcard_rows(str(workdir / name))) == list(store.load_all().items())
+
+
+def test_anki_headers(workdir):
+    source = workdir / "deck.txt"
+    source.write_text("#separator:Semicolon\n#html:true\n#notetype column:1\n"
+                      "Basic;look <b>up</b>;\"tra &amp; cứu<br>tìm\"\n", encoding="utf-8")
+    assert list(core.read_flashcard_rows(str(source))) == [("look up", "tra & cứu; tìm")]
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+import uk_core as core
+
+ENTRIES = [
+    {"meta": {"id": "run:1", "stems": ["run", "ran"]}, "hwi": {"hw": "run"}, "fl": "verb", "shortdef": ["go fast"]},
+    {"meta": {"id": "run:2", "stems": ["run"]}, "hwi": {"hw": "run"}, "fl": "noun", "shortdef": ["a jog"]},
+    {"meta": {"id": "run across", "stems": ["run across"]}, "shortdef": ["meet by chance"]},
+    {"meta": {"id": "go:1", "stems": ["go"]}, "hwi": {"hw": "go"}, "fl": "verb", "shortdef": ["move"]},
+]
+
+
+@pytest.fixture
+def offline_file(workdir, monkeypatch):
+    source = workdir / "dump.json"
+    # Mục trùng (dump ghép từ nhiều phản hồi) chỉ được chép sang từ đầu một lần
+    source.write_text(json.dumps(ENTRIES + [ENTRIES[2]]), encoding="utf-8")
+    path = str(workdir / "collegiate.ukd")
+    monkeypatch.setitem(core.OFFLINE_DICT_FILES, "collegiate", path)
+    assert core.import_dictionary(str(source), path) == 3
+    return path
+
+
+def test_round_trip(offline_file):
+    offline = core.OfflineDictionary(offline_file)
+    try:
+        assert list(offline.keys()) == ["go", "run", "run across"]
+        assert [e["meta"]["id"] for e in offline.get("Run")] == ["run:1", "run:2", "run across"]
+        assert offline.get("go") == [ENTRIES[3]]
+        assert "run across" in offline
+        assert offline.get("walk") is None
+    finally:
+        offline.close()
+
+
+def test_tsv_import(workdir):
+    source = workdir / "words.tsv"
+    source.write_text("# từ\tloại\tnghĩa\napple\tnoun\ta fruit\napple\tnoun\ta tree\nbe\tverb\texist\n",
+                      encoding="utf-8")
+    path = str(workdir / "tsv.ukd")
+    assert core.import_dictionary(str(source), path) == 2
+    offline = core.OfflineDictionary(path)
+    try:
+        assert offline.get("apple")[0]["shortdef"] == ["a fruit", "a tree"]
+    finally:
+        offline.close()
+
+
+def test_offline_lookups_need_no_network(offline_file, monkeypatch):
+    def no_network(url):
+        raise AssertionError("không được gọi API: " + url)
+
+    monkeypatch.setattr(core.api_client, "get_json", no_network)
+    meaning = core.lookup_meaning("run", translate=False)
+    assert meaning["status"] == "ok"
+    assert meaning["entries"][0]["definitions"] == ["go fast"]
+
+    phrasal = core.lookup_phrasal("run", translate=False)
+    assert phrasal["status"] == "ok"
+    assert [e["id"] for e in phrasal["entries"]] == ["run across"]
+
+
+def test_phrase_without_head_word_does_not_hide_api(workdir, monkeypatch):
+    source = workdir / "phrases.json"
+    source.write_text(json.dumps([ENTRIES[2]]), encoding="utf-8")
+    path = str(workdir / "phrases.ukd")
+    monkeypatch.setitem(core.OFFLINE_DICT_FILES, "collegiate", path)
+    assert core.import_dictionary(str(source), path) == 1
+
+    calls = []
+
+    def api(url):
+        calls.append(url)
+        return [ENTRIES[0]]
+
+    monkeypatch.setattr(core.api_client, "get_json", api)
+    meaning = core.lookup_meaning("run", translate=False)
+    assert meaning["entries"][0]["definitions"] == ["go fast"]
+    assert len(calls) == 1
+    assert core.get_offline_dict("collegiate").get("run across") == [ENTRIES[2]]
@@ -0,0 +1,82 @@
+import uk_core as core
+
+SEE = [{"meta": {"id": "see:1", "stems": ["see", "saw", "seen", "sees"]}, "shortdef": ["perceive with the eyes"]}]
+SAW = [{"meta": {"id": "saw:1", "stems": ["saw", "saws"]}, "shortdef": ["a cutting tool"]}]
+AXES = [{"meta": {"id": "axe:1", "stems": ["axe", "axes"]}}, {"meta": {"id": "axis:1", "stems": ["axis", "axes"]}}]
+
+
+def fake_api(monkeypatch, responses):
+    """Thay api_client.get_json: trả phản hồi theo từ trong URL, ném lỗi nếu responses là None (mất mạng)."""
+    calls = []
+
+    def get_json(url):
+        calls.append(url)
+        if responses is None:
+            raise IOError("mất mạng")
+        return responses[url.split("/json/")[1].split("?")[0]]
+
+    monkeypatch.setattr(core.api_client, "get_json", get_json)
+    return calls
+
+
+def test_inflected_form_is_answered_from_cache(workdir, monkeypatch):
+    cache = core.get_response_cache()
+    cache.put("collegiate", "see", SEE)
+    calls = fake_api(monkeypatch, {})
+    assert core.fetch_api("seen", core.API_URL_DICT, core.DICTIONARY_KEY) == SEE
+    assert calls == []
+    assert cache.stats()["alias_hits"] == 1
+    assert cache.contains("collegiate", "sees")
+    assert cache.get("collegiate", "sees", follow_alias=False) is None
+    assert "seen" in cache.words("collegiate")
+
+
+def test_inflected_headword_is_still_fetched(workdir, monkeypatch):
+    cache = core.get_response_cache()
+    cache.put("collegiate", "see", SEE)
+    # Tra "sawing" trả về mục "saw:2": từ đó biết "saw" là từ đầu mục riêng, không chỉ là dạng của see
+    cache.put("collegiate", "sawing", [{"meta": {"id": "saw:2", "stems": ["saw", "sawing"]}, "shortdef": ["cut"]}])
+    assert not cache.contains("collegiate", "saw")
+    calls = fake_api(monkeypatch, {"saw": SAW})
+    assert core.fetch_api("saw", core.API_URL_DICT, core.DICTIONARY_KEY) == SAW
+    assert len(calls) == 1
+
+
+def test_form_of_two_stems_is_still_fetched(workdir, monkeypatch):
+    cache = core.get_response_cache()
+    cache.put("collegiate", "axe", [{"meta": {"id": "axe:1", "stems": ["axe", "axes"]}}])
+    assert cache.contains("collegiate", "axes")
+    cache.put("collegiate", "axis", [{"meta": {"id": "axis:1", "stems": ["axis", "axes"]}}])
+    assert not cache.contains("collegiate", "axes")
+    calls = fake_api(monkeypatch, {"axes": AXES})
+    assert core.fetch_api("axes", core.API_URL_DICT, core.DICTIONARY_KEY) == AXES
+    assert len(calls) == 1
+
+
+def test_ambiguous_alias_answers_when_api_unreachable(workdir, monkeypatch):
+    cache = core.get_response_cache()
+    cache.put("collegiate", "see", SEE)
+    cache.put("collegiate", "saw", SAW)
+    cache.invalidate("collegiate", "saw")
+    calls = fake_api(monkeypatch, None)
+    assert core.fetch_api("saw", core.API_URL_DICT, core.DICTIONARY_KEY) == SEE
+    assert len(calls) == 1
+    assert cache.get("thesaurus", "seen") is None
+
+
+def test_existing_alias_is_not_overwritten(workdir):
+    cache = core.get_response_cache()
+    cache.put("collegiate", "see", SEE)
+    cache.put("collegiate", "saw", SAW)
+    # "saws" thuộc "saw"; "saw" giờ có phản hồi riêng nên luôn được ưu tiên
+    assert cache.get("collegiate", "saws") == SAW
+    assert cache.get("collegiate", "saw") == SAW
+
+
+def test_import_does_not_create_cache_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(core, "_response_cache", None)
+    core.normalize_word("x")
+    assert not (tmp_path / core.CACHE_FILE).exists()
+    core.get_response_cache()
+    assert (tmp_path / core.CACHE_FILE).exists()
@@ -0,0 +1,67 @@
+import http.client
+import json
+import threading
+
+import uk_core as core
+
+
+def request(address, method, path, body=None, conn=None):
+    conn = conn or http.client.HTTPConnection(*address, timeout=10)
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    conn.request(method, path, body=json.dumps(body).encode("utf-8") if body is not None else None, headers=headers)
+    res = conn.getresponse()
+    return res.status, json.loads(res.read() or b"null")
+
+
+def test_concurrent_lookups_share_one_upstream_request(stub_api, lookup_server):
+    stub_api.latency = 0.3
+    path = "/api/v3/references/collegiate/json/coalesce"
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(request(lookup_server, "GET", path)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [status for status, _ in results] == [200] * 8
+    assert all(data == results[0][1] for _, data in results)
+    assert results[0][1][0]["meta"]["id"] == "coalesce:1"
+    assert stub_api.requests == 1
+
+    # Lần sau lấy từ cache của server
+    assert request(lookup_server, "GET", path)[0] == 200
+    assert stub_api.requests == 1
+
+
+def test_lookup_route_returns_parsed_record(stub_api, lookup_server, translator):
+    status, record = request(lookup_server, "GET", "/lookup/meaning?word=run")
+    assert status == 200
+    assert record["status"] == "ok"
+    assert record["entries"][0]["definitions"][0]["vi"].startswith("[vi] ")
+
+
+def test_translate_uses_shared_translation_cache(lookup_server, translator):
+    status, data = request(lookup_server, "POST", "/translate", {"texts": ["hello", "world"]})
+    assert status == 200
+    assert data == {"translations": ["[vi] hello", "[vi] world"]}
+    calls = translator.calls
+
+    status, data = request(lookup_server, "POST", "/translate", {"texts": ["world", "hello"]})
+    assert data == {"translations": ["[vi] world", "[vi] hello"]}
+    assert translator.calls == calls
+
+
+def test_translate_rejects_bad_body(lookup_server, translator):
+    assert request(lookup_server, "POST", "/translate", {"text": "x"})[0] == 400
+    too_many = {"texts": ["x"] * (core.SERVER_MAX_TRANSLATE_TEXTS + 1)}
+    assert request(lookup_server, "POST", "/translate", too_many)[0] == 413
+
+
+def test_unknown_post_keeps_connection_usable(lookup_server):
+    conn = http.client.HTTPConnection(*lookup_server, timeout=10)
+    status, _ = request(lookup_server, "POST", "/nope", {"texts": ["a"]}, conn=conn)
+    assert status == 404
+    status, data = request(lookup_server, "GET", "/health", conn=conn)
+    assert status == 200
+    assert "response_cache" in data
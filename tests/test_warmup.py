@@ -0,0 +1,69 @@
+import uk_core as core
+
+
+def write_words(path, words):
+    path.write_text("\n".join(words) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_resume_skips_words_already_done(stub_api, workdir, monkeypatch):
+    progress = str(workdir / "progress.txt")
+    url_templates = [(core.API_URL_DICT, core.DICTIONARY_KEY)]
+    first = core.read_word_list(write_words(workdir / "a.txt", ["alpha", "beta", "gamma"]))
+    stats = core.warm_up(first, url_templates, concurrency=2, rate=0, translate=False,
+                         progress_file=progress, report=lambda msg: None)
+    assert stats == {"done": 3, "failed": 0}
+    assert stub_api.requests == 3
+
+    # Cache mới: từ được bỏ qua là nhờ file tiến độ, không phải nhờ cache
+    monkeypatch.setattr(core, "_response_cache", None)
+    (workdir / core.CACHE_FILE).unlink()
+    second = core.read_word_list(write_words(workdir / "b.txt", ["alpha", "beta", "gamma", "delta", "Alpha"]))
+    stats = core.warm_up(second, url_templates, concurrency=2, rate=0, translate=False,
+                         progress_file=progress, report=lambda msg: None)
+    assert stats == {"done": 1, "failed": 0}
+    assert stub_api.requests == 4
+    assert core.load_warmup_progress(progress) == {"alpha", "beta", "gamma", "delta"}
+
+
+def test_failed_words_are_retried_next_run(stub_api, workdir, monkeypatch):
+    progress = str(workdir / "progress.txt")
+    url_templates = [(core.API_URL_DICT, core.DICTIONARY_KEY)]
+    real_fetch = core.fetch_api
+
+    def flaky_fetch(word, *args, **kwargs):
+        if word == "broken":
+            raise IOError("upstream down")
+        return real_fetch(word, *args, **kwargs)
+
+    monkeypatch.setattr(core, "fetch_api", flaky_fetch)
+    stats = core.warm_up(["ok", "broken"], url_templates, rate=0, translate=False,
+                         progress_file=progress, report=lambda msg: None)
+    assert stats == {"done": 1, "failed": 1}
+    assert core.load_warmup_progress(progress) == {"ok"}
+
+    monkeypatch.setattr(core, "fetch_api", real_fetch)
+    stats = core.warm_up(["ok", "broken"], url_templates, rate=0, translate=False,
+                         progress_file=progress, report=lambda msg: None)
+    assert stats == {"done": 1, "failed": 0}
+
+
+def test_untranslated_word_is_not_marked_done(workdir, translator, monkeypatch):
+    progress = str(workdir / "progress.txt")
+    url_templates = [(core.API_URL_DICT, core.DICTIONARY_KEY)]
+    monkeypatch.setattr(core, "fetch_api", lambda word, *args, **kwargs: [
+        {"meta": {"id": word + ":1"}, "shortdef": [f"{word} one", f"{word} two"]}])
+
+    class DownTranslator:
+        def translate(self, text):
+            raise IOError("dịch lỗi")
+
+    monkeypatch.setattr(core, "_translator", DownTranslator())
+    stats = core.warm_up(["run"], url_templates, rate=0, progress_file=progress, report=lambda msg: None)
+    assert stats == {"done": 0, "failed": 1}
+    assert core.load_warmup_progress(progress) == set()
+
+    monkeypatch.setattr(core, "_translator", translator)
+    stats = core.warm_up(["run"], url_templates, rate=0, progress_file=progress, report=lambda msg: None)
+    assert stats == {"done": 1, "failed": 0}
+    assert core.load_warmup_progress(progress) == {"run"}
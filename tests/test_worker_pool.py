@@ -0,0 +1,88 @@
+import queue
+import threading
+
+import pytest
+
+import uk_core as core
+
+
+@pytest.fixture
+def gate():
+    """Event giữ worker bận; luôn được mở khi test xong để thread không treo."""
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def occupy(pool, gate, priority=core.PRIORITY_USER):
+    """Chiếm một worker cho tới khi gate mở; trả về khi việc đã thật sự chạy."""
+    started = threading.Event()
+    future = pool.submit(lambda: (started.set(), gate.wait(5)), priority=priority)
+    assert started.wait(5)
+    return future
+
+
+def test_full_queue_evicts_lowest_priority(gate):
+    pool = core.WorkerPool(workers=1, max_queue=2)
+    occupy(pool, gate)
+    background = pool.submit(lambda: "bg", priority=core.PRIORITY_BACKGROUND)
+    prefetch = pool.submit(lambda: "prefetch", priority=core.PRIORITY_PREFETCH)
+
+    user = pool.submit(lambda: "user", priority=core.PRIORITY_USER, block=False)
+    assert prefetch.cancelled() and not background.cancelled()
+    with pytest.raises(queue.Full):
+        pool.submit(lambda: None, priority=core.PRIORITY_PREFETCH, block=False)
+    with pytest.raises(queue.Full):
+        pool.submit(lambda: None, priority=core.PRIORITY_BACKGROUND, timeout=0.05)
+
+    gate.set()
+    assert (user.result(5), background.result(5)) == ("user", "bg")
+    stats = pool.stats()
+    assert (stats["dropped"], stats["rejected"]) == (1, 2)
+
+
+def test_evicted_job_callback_can_resubmit(gate):
+    pool = core.WorkerPool(workers=1, max_queue=1)
+    occupy(pool, gate)
+    resubmitted = []
+
+    def relaunch():
+        # Chạy trên worker nên không được chờ hàng đợi: đầy thì đợi việc kế tiếp xong
+        try:
+            resubmitted.append(pool.submit(lambda: "again", priority=core.PRIORITY_PREFETCH, block=False))
+        except queue.Full:
+            assert pool.call_after_next_job(relaunch)
+
+    def requeue(future):
+        if future.cancelled():
+            assert pool.call_after_next_job(relaunch)
+
+    pool.submit(lambda: "first", priority=core.PRIORITY_PREFETCH).add_done_callback(requeue)
+    user = pool.submit(lambda: "user", priority=core.PRIORITY_USER)
+    gate.set()
+    assert user.result(5) == "user"
+    for _ in range(100):
+        if resubmitted:
+            break
+        threading.Event().wait(0.02)
+    assert resubmitted[0].result(5) == "again"
+
+
+def test_priority_concurrency_cap(gate):
+    pool = core.WorkerPool(workers=3, concurrency={core.PRIORITY_BACKGROUND: 1})
+    occupy(pool, gate, priority=core.PRIORITY_BACKGROUND)
+    second = pool.submit(lambda: "bg2", priority=core.PRIORITY_BACKGROUND)
+
+    # Thread rảnh vẫn không nhận việc nền thứ hai, nhưng lượt tra chạy ngay
+    assert pool.submit(lambda: "user").result(5) == "user"
+    stats = pool.stats()
+    assert stats["running_by_priority"]["background"] == 1
+    assert stats["queued_by_priority"]["background"] == 1
+
+    gate.set()
+    assert second.result(5) == "bg2"
+
+
+def test_call_after_next_job_on_idle_pool():
+    pool = core.WorkerPool(workers=1)
+    assert not pool.call_after_next_job(lambda: None)
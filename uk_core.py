@@ -0,0 +1,2741 @@
+# Lõi tra từ / dịch / lưu trữ của Sổ tay TOEIC, không phụ thuộc Tkinter.
+# Dùng được trong script, test hoặc server; uk_dict.py chỉ là lớp giao diện bên trên.
+# requests và deep_translator import khá chậm: chỉ import khi thật sự gọi mạng / dịch lần đầu
+import urllib.parse
+import time
+import threading
+import json
+import sqlite3
+import os
+import sys
+import argparse
+import random
+import queue
+import bisect
+import math
+import re
+import unicodedata
+import functools
+import mmap
+import struct
+import csv
+import heapq
+import html
+import itertools
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict, deque
+
+# ====== CONFIG ======
+DICTIONARY_KEY = "e1fd3412-7310-4f5f-a50d-9b0c257660e1"
+THESAURUS_KEY = "816b0b3b-c13c-4179-aa49-8c0c98aa26ff"
+
+API_URL_DICT = "https://www.dictionaryapi.com/api/v3/references/collegiate/json/{}?key={}"
+API_URL_THES = "https://www.dictionaryapi.com/api/v3/references/thesaurus/json/{}?key={}"
+
+TRANSLATE_SOURCE = "en"
+TRANSLATE_TARGET = "vi"
+
+DEFAULT_API_BASE = "https://www.dictionaryapi.com"
+
+def set_api_base(api_base):
+    """Trỏ các URL API sang host khác (vd. server giả lập khi test), giữ nguyên đường dẫn để khóa cache không đổi."""
+    global API_URL_DICT, API_URL_THES
+    base = api_base.rstrip("/")
+    API_URL_DICT = API_URL_DICT.replace(DEFAULT_API_BASE, base)
+    API_URL_THES = API_URL_THES.replace(DEFAULT_API_BASE, base)
+
+def endpoint_config(endpoint):
+    """(URL template, key) hiện hành của endpoint "collegiate" / "thesaurus".
+
+    Đọc lúc gọi chứ không lúc import, để set_api_base / use_lookup_server có hiệu lực với mọi nơi gọi.
+    """
+    if endpoint == "thesaurus":
+        return API_URL_THES, THESAURUS_KEY
+    return API_URL_DICT, DICTIONARY_KEY
+
+_translator = None
+_translator_lock = threading.Lock()
+
+def get_translator():
+    """Tạo GoogleTranslator ở lần dịch đầu tiên."""
+    global _translator
+    with _translator_lock:
+        if _translator is None:
+            from deep_translator import GoogleTranslator
+            _translator = GoogleTranslator(source=TRANSLATE_SOURCE, target=TRANSLATE_TARGET)
+    return _translator
+
+def set_translator(translator):
+    """Thay bộ dịch (vd. bộ dịch giả khi benchmark / test). Chỉ cần có phương thức translate(text)."""
+    global _translator
+    with _translator_lock:
+        _translator = translator
+
+LOOKUP_SERVER = None   # URL của server tra từ dùng chung (xem LOOKUP SERVER); None = gọi thẳng API / Google
+
+def use_lookup_server(server_url):
+    """Tra từ và dịch qua server dùng chung (python uk_core.py serve) thay vì dictionaryapi.com / Google Translate."""
+    global LOOKUP_SERVER
+    set_api_base(server_url)
+    LOOKUP_SERVER = server_url.rstrip("/")
+
+# ====== TIMING / TRACE (đo thời gian từng giai đoạn) ======
+# UK_DICT_TRACE=trace.jsonl python uk_dict.py  -> mỗi lượt tra được ghi thành một dòng JSON
+TRACE_FILE_ENV = "UK_DICT_TRACE"
+TRACE_RECENT = 50              # số lượt tra gần nhất giữ lại cho cửa sổ chẩn đoán
+TRACE_STAGE_SAMPLES = 500      # số mẫu gần nhất mỗi giai đoạn để tính p50 / p95
+
+_trace_local = threading.local()
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+def _union_length(intervals):
+    """Tổng độ dài hợp các khoảng [start, end): span chạy song song không bị cộng hai lần."""
+    total, cur_start, cur_end = 0.0, None, None
+    for start, end in sorted(intervals):
+        if cur_end is None or start > cur_end:
+            if cur_end is not None:
+                total += cur_end - cur_start
+            cur_start, cur_end = start, end
+        else:
+            cur_end = max(cur_end, end)
+    if cur_end is not None:
+        total += cur_end - cur_start
+    return total
+
+class Trace:
+    """Một lượt tra cứu: các span (stage, bắt đầu, thời lượng) tính bằng giây kể từ lúc tạo.
+
+    Trace kết thúc khi mọi bên đang giữ (hold) đã release, vd. worker thread và hiệu ứng gõ chữ.
+    """
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.started = time.time()
+        self.total = None
+        self.spans = []
+        self._t0 = time.perf_counter()
+        self._holds = 1
+        self._lock = threading.Lock()
+
+    def add(self, stage, start, duration):
+        with self._lock:
+            self.spans.append((stage, start - self._t0, duration))
+
+    @contextmanager
+    def activate(self):
+        """Các span trong khối with (cùng thread) được gắn vào trace này."""
+        previous = getattr(_trace_local, "trace", None)
+        _trace_local.trace = self
+        try:
+            yield self
+        finally:
+            _trace_local.trace = previous
+
+    def hold(self):
+        with self._lock:
+            self._holds += 1
+
+    def release(self):
+        with self._lock:
+            self._holds -= 1
+            done = self._holds <= 0
+        if done:
+            self.finish()
+
+    def finish(self):
+        with self._lock:
+            if self.total is not None:
+                return
+            self.total = max([time.perf_counter() - self._t0] + [s + d for _, s, d in self.spans])
+        tracer.record_trace(self)
+
+    def breakdown(self):
+        """stage -> giây (thời gian thực stage chiếm, span lồng / song song không cộng trùng)."""
+        with self._lock:
+            spans = list(self.spans)
+        intervals = {}
+        for stage, start, duration in spans:
+            intervals.setdefault(stage, []).append((start, start + duration))
+        return {stage: _union_length(iv) for stage, iv in intervals.items()}
+
+    def to_dict(self):
+        with self._lock:
+            spans = [{"stage": st, "start_ms": s * 1000, "duration_ms": d * 1000} for st, s, d in self.spans]
+        return {
+            "name": self.name,
+            "started": self.started,
+            "total_ms": self.total * 1000 if self.total is not None else None,
+            "breakdown_ms": {k: v * 1000 for k, v in self.breakdown().items()},
+            "spans": spans,
+            **self.attrs,
+        }
+
+def current_trace():
+    return getattr(_trace_local, "trace", None)
+
+class Tracer:
+    """Gom số liệu mọi span theo giai đoạn và giữ các trace gần nhất; tùy chọn ghi trace ra JSONL."""
+
+    def __init__(self, recent=TRACE_RECENT, samples=TRACE_STAGE_SAMPLES):
+        self._lock = threading.Lock()
+        self._samples = samples
+        self.recent = deque(maxlen=recent)
+        self.stages = {}
+        self.export_path = None
+
+    def enable_export(self, path):
+        self.export_path = path
+
+    def record_span(self, stage, start, duration, trace=None):
+        with self._lock:
+            samples = self.stages.get(stage)
+            if samples is None:
+                samples = self.stages[stage] = deque(maxlen=self._samples)
+            samples.append(duration)
+        if trace is not None:
+            trace.add(stage, start, duration)
+
+    def record_trace(self, trace):
+        with self._lock:
+            self.recent.append(trace)
+            if self.export_path:
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+
+    def recent_traces(self):
+        with self._lock:
+            return list(self.recent)
+
+    def stage_stats(self):
+        """stage -> {count, p50_ms, p95_ms} trên các mẫu gần nhất."""
+        with self._lock:
+            snapshot = {stage: sorted(samples) for stage, samples in self.stages.items()}
+        return {
+            stage: {
+                "count": len(values),
+                "p50_ms": percentile(values, 0.5) * 1000,
+                "p95_ms": percentile(values, 0.95) * 1000,
+            }
+            for stage, values in snapshot.items()
+        }
+
+    def export_jsonl(self, path):
+        """Ghi các trace gần nhất ra file JSONL, trả về số dòng đã ghi."""
+        traces = self.recent_traces()
+        with open(path, "w", encoding="utf-8") as f:
+            for trace in traces:
+                f.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+        return len(traces)
+
+tracer = Tracer()
+if os.environ.get(TRACE_FILE_ENV):
+    tracer.enable_export(os.environ[TRACE_FILE_ENV])
+
+@contextmanager
+def span(stage, trace=None):
+    """Đo một giai đoạn; gắn vào trace truyền vào, hoặc trace đang active trong thread hiện tại."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        tracer.record_span(stage, start, time.perf_counter() - start, trace or current_trace())
+
+def timed(stage):
+    """Decorator: bọc cả hàm trong span(stage)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# ====== CANCELLATION (bỏ việc của lượt tra đã bị thay thế) ======
+class CancelToken:
+    """Cờ hủy dùng chung giữa giao diện và worker: lượt tra mới hủy token của lượt cũ."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def wait(self, seconds):
+        """Ngủ tối đa seconds giây, dậy sớm nếu bị hủy. Trả về True nếu đã bị hủy."""
+        return self._event.wait(seconds)
+
+# ====== TRANSLATE UTILITIES ======
+def safe_translate(text):
+    """Dịch an toàn, tránh lỗi NoneType. Kết quả dịch thành công được lưu vào get_translation_cache()."""
+    try:
+        if not text or not isinstance(text, str):
+            return text
+        cached = get_translation_cache().get(TRANSLATE_SOURCE, TRANSLATE_TARGET, text)
+        if cached is not None:
+            return cached
+        if LOOKUP_SERVER:
+            return _translate_remote([text])[0]
+        with span("translate_request"):
+            translated = get_translator().translate(text)
+        if not translated or translated.strip() == "":
+            return text
+        get_translation_cache().put(TRANSLATE_SOURCE, TRANSLATE_TARGET, text, translated)
+        return translated
+    except Exception as e:
+        # print("⚠️ Lỗi dịch:", e) # Bỏ comment nếu muốn debug
+        # Không cache khi lỗi: trả về tiếng Anh, lần sau sẽ thử dịch lại
+        return text
+
+TRANSLATE_DELAY = 0.25        # Nghỉ giữa các nhóm dịch liên tiếp
+TRANSLATE_CHUNK_CHARS = 4500   # GoogleTranslator giới hạn 5000 ký tự mỗi request
+TRANSLATE_BATCH_SEPARATOR = "\n"
+
+def _chunk_texts(texts, indices, max_chars=TRANSLATE_CHUNK_CHARS):
+    """Gom các chỉ số cần dịch thành từng nhóm, mỗi nhóm ghép lại không vượt quá max_chars."""
+    chunk, size = [], 0
+    for i in indices:
+        text = texts[i]
+        # Đoạn có chứa ký tự phân cách hoặc quá dài thì gửi riêng
+        if TRANSLATE_BATCH_SEPARATOR in text or len(text) >= max_chars:
+            if chunk:
+                yield chunk
+                chunk, size = [], 0
+            yield [i]
+            continue
+        extra = len(text) + (len(TRANSLATE_BATCH_SEPARATOR) if chunk else 0)
+        if chunk and size + extra > max_chars:
+            yield chunk
+            chunk, size = [], 0
+            extra = len(text)
+        chunk.append(i)
+        size += extra
+    if chunk:
+        yield chunk
+
+def _translate_chunk(texts):
+    """Dịch một nhóm đoạn trong MỘT request (ghép bằng xuống dòng rồi tách lại).
+
+    Nếu số dòng trả về không khớp thì dịch lại từng đoạn bằng safe_translate.
+    """
+    if len(texts) == 1:
+        return [safe_translate(texts[0])]
+    try:
+        with span("translate_request"):
+            joined = get_translator().translate(TRANSLATE_BATCH_SEPARATOR.join(texts))
+        parts = [p.strip() for p in joined.split(TRANSLATE_BATCH_SEPARATOR)] if joined else []
+    except Exception:
+        parts = []
+    if len(parts) != len(texts) or not all(parts):
+        return [safe_translate(t) for t in texts]
+    for text, translated in zip(texts, parts):
+        get_translation_cache().put(TRANSLATE_SOURCE, TRANSLATE_TARGET, text, translated)
+    return parts
+
+def _translate_remote(texts):
+    """Dịch cả danh sách qua server dùng chung trong một request. Lỗi thì trả lại tiếng Anh và không cache."""
+    try:
+        with span("translate_request"):
+            res = api_client.session.post(LOOKUP_SERVER + "/translate", json={"texts": texts}, timeout=api_client.timeout)
+        res.raise_for_status()
+        translated = res.json()["translations"]
+    except Exception:
+        return list(texts)
+    if len(translated) != len(texts):
+        return list(texts)
+    for text, vi in zip(texts, translated):
+        if vi and vi != text:
+            get_translation_cache().put(TRANSLATE_SOURCE, TRANSLATE_TARGET, text, vi)
+    return translated
+
+@timed("translate")
+def translate_batch(texts, on_result=None, cancel=None):
+    """Dịch cả danh sách đoạn văn với số request tỉ lệ theo số nhóm, không theo số đoạn.
+
+    on_result(i, vi) được gọi ngay khi đoạn thứ i có bản dịch (cache trước, rồi từng nhóm).
+    Khi cancel (CancelToken) bị hủy thì dừng trước nhóm kế tiếp, các đoạn chưa dịch giữ nguyên tiếng Anh.
+    """
+    results = list(texts)
+    pending = []
+    for i, text in enumerate(texts):
+        if not text or not isinstance(text, str):
+            if on_result:
+                on_result(i, text)
+            continue
+        cached = get_translation_cache().get(TRANSLATE_SOURCE, TRANSLATE_TARGET, text)
+        if cached is None:
+            pending.append(i)
+            continue
+        results[i] = cached
+        if on_result:
+            on_result(i, cached)
+
+    if cancel is not None and cancel.cancelled:
+        return results
+    if LOOKUP_SERVER and pending:
+        # Server tự chia nhóm và dùng bộ nhớ dịch chung, client chỉ cần một request
+        for i, vi in zip(pending, _translate_remote([texts[i] for i in pending])):
+            results[i] = vi
+            if on_result:
+                on_result(i, vi)
+        return results
+
+    for n, chunk in enumerate(_chunk_texts(texts, pending)):
+        if cancel is not None and (cancel.cancelled or (n > 0 and cancel.wait(TRANSLATE_DELAY))):
+            break
+        if n > 0 and cancel is None:
+            time.sleep(TRANSLATE_DELAY)
+        translated = _translate_chunk([texts[i] for i in chunk])
+        for i, vi in zip(chunk, translated):
+            results[i] = vi
+            if on_result:
+                on_result(i, vi)
+    return results
+
+# ====== FETCH API (cache + gộp request trùng) ======
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def single_flight(flight_key, fn):
+    """Chạy fn() một lần cho mỗi flight_key đang bay; các thread gọi trùng khóa chờ và nhận chung kết quả."""
+    with _inflight_lock:
+        future = _inflight.get(flight_key)
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight[flight_key] = future
+    if not owner:
+        return future.result()
+
+    try:
+        data = fn()
+        future.set_result(data)
+        return data
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(flight_key, None)
+
+def fetch_api(word, url_template, key, use_cache=True):
+    """Gọi API, ưu tiên từ điển offline (nếu đã import) rồi đến cache. use_cache=False để bỏ qua cả hai và tải lại.
+
+    Nhiều thread cùng tra một (endpoint, từ) thì chỉ một request thật được gửi đi, các thread khác chờ kết quả đó.
+    """
+    endpoint = endpoint_name(url_template)
+    if use_cache:
+        offline = get_offline_dict(endpoint)
+        if offline is not None:
+            with span("offline_lookup"):
+                entries = offline.get(word)
+            if entries is not None:
+                return entries
+        with span("cache_lookup"):
+            cached = get_response_cache().get(endpoint, word)
+        if cached is not None:
+            return cached
+
+    return single_flight((endpoint, normalize_word(word)),
+                         lambda: _fetch_remote(word, url_template, key, endpoint))
+
+def _fetch_remote(word, url_template, key, endpoint):
+    encoded_word = urllib.parse.quote(word)
+    url = url_template.format(encoded_word, key)
+    try:
+        with span("http"):
+            data = api_client.get_json(url)
+    except Exception:
+        # Mất mạng / API lỗi / đang ngắt mạch: dùng bản cache đã hết hạn nếu có, kể cả qua alias
+        # nhập nhằng (vd. "saw" -> "see") vì vẫn hơn là không có gì (chế độ offline)
+        stale = get_response_cache().get(endpoint, word, allow_stale=True, allow_ambiguous=True)
+        if stale is not None:
+            return stale
+        raise
+
+    get_response_cache().put(endpoint, word, data)
+    return data
+
+# ====== HTTP CLIENT (Session dùng chung, timeout, retry, circuit breaker) ======
+HTTP_CONNECT_TIMEOUT = 3.05
+HTTP_READ_TIMEOUT = 10
+HTTP_MAX_RETRIES = 2
+HTTP_BACKOFF_BASE = 0.3         # giây, nhân đôi sau mỗi lần thử lại
+HTTP_POOL_SIZE = 10
+CIRCUIT_FAIL_THRESHOLD = 5      # số lần lỗi liên tiếp trước khi ngắt mạch
+CIRCUIT_COOLDOWN = 30           # giây chờ trước khi cho thử lại
+
+class CircuitOpenError(Exception):
+    """API đang bị coi là sập, từ chối gọi ngay thay vì chờ timeout."""
+
+class ApiClient:
+    """HTTP client dùng chung cho dictionaryapi.com: giữ kết nối (keep-alive), có timeout,
+    thử lại với backoff ngẫu nhiên khi lỗi 5xx / lỗi kết nối, và ngắt mạch khi API sập.
+    """
+
+    def __init__(self, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT), max_retries=HTTP_MAX_RETRIES,
+                 backoff=HTTP_BACKOFF_BASE, pool_size=HTTP_POOL_SIZE,
+                 fail_threshold=CIRCUIT_FAIL_THRESHOLD, cooldown=CIRCUIT_COOLDOWN):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.fail_threshold = fail_threshold
+        self.cooldown = cooldown
+        self.pool_size = pool_size
+        self._session = None
+
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+        self.total_latency = 0.0
+        self.latencies = deque(maxlen=200)
+
+    @property
+    def session(self):
+        """Session (và module requests) chỉ được tạo ở request đầu tiên."""
+        with self._lock:
+            if self._session is None:
+                import requests
+                import requests.adapters
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def _check_circuit(self):
+        with self._lock:
+            if time.time() < self._open_until:
+                self.rejected += 1
+                raise CircuitOpenError("API tạm thời không phản hồi, thử lại sau ít phút.")
+
+    def _record(self, ok, latency):
+        with self._lock:
+            self.requests += 1
+            self.total_latency += latency
+            self.latencies.append(latency)
+            if ok:
+                self._consecutive_failures = 0
+                return
+            self.failures += 1
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.fail_threshold:
+                self._open_until = time.time() + self.cooldown
+
+    def get_json(self, url):
+        session = self.session
+        import requests
+        self._check_circuit()
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                res = session.get(url, timeout=self.timeout)
+                retryable = res.status_code >= 500
+                if not retryable:
+                    res.raise_for_status()
+                    with span("json_decode"):
+                        data = res.json()
+                    self._record(True, time.perf_counter() - start)
+                    return data
+                error = requests.HTTPError(f"{res.status_code} Server Error", response=res)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except Exception:
+                # Lỗi 4xx / JSON hỏng: không thử lại, nhưng API vẫn sống
+                self._record(True, time.perf_counter() - start)
+                raise
+
+            self._record(False, time.perf_counter() - start)
+            if attempt >= self.max_retries:
+                raise error
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+            # Exponential backoff + jitter để tránh dồn request cùng lúc
+            time.sleep(self.backoff * (2 ** (attempt - 1)) * (0.5 + random.random()))
+            self._check_circuit()
+
+    def stats(self):
+        with self._lock:
+            recent = sorted(self.latencies)
+            return {
+                "requests": self.requests,
+                "failures": self.failures,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "avg_latency": self.total_latency / self.requests if self.requests else 0.0,
+                "p95_latency": recent[int(len(recent) * 0.95)] if recent else 0.0,
+                "circuit_open": time.time() < self._open_until,
+            }
+
+api_client = ApiClient()
+
+# ====== RESPONSE CACHE (SQLite, TTL + LRU) ======
+CACHE_FILE = "lookup_cache.db"
+CACHE_TTL_SECONDS = 7 * 24 * 3600   # 7 ngày
+CACHE_MAX_ENTRIES = 5000
+
+def endpoint_name(url_template):
+    """Lấy tên endpoint (collegiate / thesaurus) từ URL template để làm khóa cache."""
+    path = url_template.split("?")[0]
+    parts = [p for p in path.split("/") if p and p != "{}"]
+    if len(parts) >= 2 and parts[-1] == "json":
+        return parts[-2]
+    return path
+
+def normalize_word(word):
+    """Chuẩn hóa từ tra: chữ thường, gộp khoảng trắng."""
+    return " ".join(str(word).lower().split())
+
+def alias_forms(word, data):
+    """Các dạng biến đổi (meta.stems) của chính từ đã tra, lấy từ các mục có meta.id đúng là từ đó.
+
+    Chỉ lấy dạng một từ: cụm như "run across" cần phản hồi riêng của API (phrasal verb).
+    """
+    key = normalize_word(word)
+    if not data or not isinstance(data[0], dict):
+        return set()
+    forms = set()
+    for entry_data in data:
+        meta = entry_data.get("meta", {}) if isinstance(entry_data, dict) else {}
+        if normalize_word(meta.get("id", "").split(":")[0]) != key:
+            continue
+        for stem in meta.get("stems", []):
+            form = normalize_word(stem)
+            if form and " " not in form and form != key:
+                forms.add(form)
+    return forms
+
+def response_headwords(data):
+    """Các từ đầu mục (meta.id bỏ hậu tố ':1') có trong một phản hồi."""
+    if not data or not isinstance(data[0], dict):
+        return set()
+    return {normalize_word(entry_data.get("meta", {}).get("id", "").split(":")[0])
+            for entry_data in data if isinstance(entry_data, dict)} - {""}
+
+class ResponseCache:
+    """Cache phản hồi API trên đĩa, khóa theo (endpoint, từ đã chuẩn hóa).
+
+    Mục hết hạn sau `ttl` giây; khi vượt `max_entries` thì xóa mục ít dùng nhất (LRU).
+    Bảng aliases ánh xạ dạng biến đổi (running, ran...) về từ đã cache (run) để tra các dạng đó không cần mạng.
+    Dạng nhập nhằng không được dùng khi còn gọi được API: dạng thuộc nhiều từ gốc, hoặc chính nó là từ đầu mục
+    trong một phản hồi đã cache (saw là dạng của see nhưng cũng là danh từ "saw").
+    """
+
+    def __init__(self, path, ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.alias_hits = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " endpoint TEXT NOT NULL,"
+            " word TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " PRIMARY KEY (endpoint, word))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_access ON responses (last_access)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS aliases ("
+            " endpoint TEXT NOT NULL,"
+            " alias TEXT NOT NULL,"
+            " canonical TEXT NOT NULL,"
+            " ambiguous INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (endpoint, alias))"
+        )
+        if "ambiguous" not in {row[1] for row in self._conn.execute("PRAGMA table_info(aliases)")}:
+            self._conn.execute("ALTER TABLE aliases ADD COLUMN ambiguous INTEGER NOT NULL DEFAULT 0")
+        # Từ đầu mục (meta.id) đã gặp trong các phản hồi: dạng biến đổi trùng với chúng là nhập nhằng
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS headwords ("
+            " endpoint TEXT NOT NULL,"
+            " word TEXT NOT NULL,"
+            " PRIMARY KEY (endpoint, word))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    def _resolve(self, endpoint, key, follow_alias=False, allow_ambiguous=False):
+        """Dòng (payload, fetched_at, từ khóa thật) của key; follow_alias=True thì đi qua bảng aliases nếu key chưa được cache trực tiếp.
+
+        Alias nhập nhằng chỉ được dùng khi allow_ambiguous=True (lúc không gọi được API).
+        """
+        row = self._conn.execute(
+            "SELECT payload, fetched_at FROM responses WHERE endpoint = ? AND word = ?",
+            (endpoint, key)
+        ).fetchone()
+        if row is not None:
+            return row[0], row[1], key
+        if not follow_alias:
+            return None
+        row = self._conn.execute(
+            "SELECT r.payload, r.fetched_at, r.word FROM aliases a"
+            " JOIN responses r ON r.endpoint = a.endpoint AND r.word = a.canonical"
+            " WHERE a.endpoint = ? AND a.alias = ? AND (a.ambiguous = 0 OR ?)",
+            (endpoint, key, allow_ambiguous)
+        ).fetchone()
+        return row
+
+    def get(self, endpoint, word, allow_stale=False, follow_alias=True, allow_ambiguous=False):
+        """Trả về dữ liệu đã cache (qua alias nếu là dạng biến đổi không nhập nhằng), hoặc None nếu chưa có / đã hết hạn.
+
+        follow_alias=False: chỉ khớp đúng từ. allow_ambiguous=True: dùng cả alias nhập nhằng (khi mất mạng).
+        """
+        key = normalize_word(word)
+        now = time.time()
+        with self._lock:
+            row = self._resolve(endpoint, key, follow_alias, allow_ambiguous)
+            if row is None or (not allow_stale and self.ttl is not None and now - row[1] > self.ttl):
+                if not allow_stale:
+                    self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE endpoint = ? AND word = ?",
+                (now, endpoint, row[2])
+            )
+            self._conn.commit()
+            if not allow_stale:
+                self.hits += 1
+            if row[2] != key:
+                self.alias_hits += 1
+        return json.loads(row[0])
+
+    def put(self, endpoint, word, data):
+        key = normalize_word(word)
+        now = time.time()
+        payload = json.dumps(data, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (endpoint, word, payload, fetched_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (endpoint, key, payload, now, now)
+            )
+            self._add_aliases(endpoint, key, data)
+            self._evict()
+            self._conn.commit()
+
+    def _add_aliases(self, endpoint, key, data):
+        heads = response_headwords(data)
+        self._conn.executemany("INSERT OR IGNORE INTO headwords (endpoint, word) VALUES (?, ?)",
+                               [(endpoint, head) for head in heads])
+        # Dạng đã có alias nay hóa ra là từ đầu mục riêng
+        self._conn.executemany("UPDATE aliases SET ambiguous = 1 WHERE endpoint = ? AND alias = ?",
+                               [(endpoint, head) for head in heads])
+        for form in alias_forms(key, data):
+            row = self._conn.execute(
+                "SELECT canonical FROM aliases WHERE endpoint = ? AND alias = ?", (endpoint, form)
+            ).fetchone()
+            if row is None:
+                is_head = self._conn.execute(
+                    "SELECT 1 FROM headwords WHERE endpoint = ? AND word = ?", (endpoint, form)
+                ).fetchone() is not None
+                self._conn.execute(
+                    "INSERT INTO aliases (endpoint, alias, canonical, ambiguous) VALUES (?, ?, ?, ?)",
+                    (endpoint, form, key, int(is_head))
+                )
+            elif row[0] != key:
+                # Dạng thuộc hai từ gốc (vd. "axes" của axe và axis): giữ từ gốc đầu tiên, đánh dấu nhập nhằng
+                self._conn.execute(
+                    "UPDATE aliases SET ambiguous = 1 WHERE endpoint = ? AND alias = ?", (endpoint, form)
+                )
+
+    def ensure_aliases(self):
+        """Lần đầu chạy phiên bản có bảng aliases: dựng alias từ mọi phản hồi đã cache (chạy ở thread nền).
+
+        Dựng lại từ đầu nếu bảng được dựng bởi phiên bản chưa đánh dấu alias nhập nhằng.
+        """
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM cache_meta WHERE key = 'aliases_built_v2'").fetchone():
+                return
+            with self._conn:
+                self._conn.execute("DELETE FROM aliases")
+            rows = self._conn.execute("SELECT endpoint, word, payload FROM responses").fetchall()
+        for endpoint, word, payload in rows:
+            try:
+                data = json.loads(payload)
+            except ValueError:
+                continue
+            with self._lock:
+                self._add_aliases(endpoint, word, data)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO cache_meta (key, value) VALUES ('aliases_built_v2', '1')")
+
+    def contains(self, endpoint, word):
+        """Kiểm tra mục còn hạn mà không tính vào hit/miss và không đổi thứ tự LRU."""
+        with self._lock:
+            row = self._resolve(endpoint, normalize_word(word), follow_alias=True)
+        return row is not None and (self.ttl is None or time.time() - row[1] <= self.ttl)
+
+    def invalidate(self, endpoint, word):
+        """Xóa một mục khỏi cache (lần tra sau sẽ gọi lại API)."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM responses WHERE endpoint = ? AND word = ?",
+                (endpoint, normalize_word(word))
+            )
+            self._conn.execute(
+                "DELETE FROM aliases WHERE endpoint = ? AND canonical = ?",
+                (endpoint, normalize_word(word))
+            )
+            self._conn.commit()
+
+    def words(self, endpoint=None):
+        """Các từ đã tra được (bỏ qua mục chỉ chứa danh sách gợi ý) và các dạng biến đổi của chúng, kể cả mục đã hết hạn."""
+        query = "SELECT word FROM responses WHERE payload LIKE '[{%'"
+        alias_query = "SELECT alias FROM aliases"
+        params = ()
+        if endpoint:
+            query += " AND endpoint = ?"
+            alias_query += " WHERE endpoint = ?"
+            params = (endpoint, endpoint)
+        query += " UNION " + alias_query
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, params)]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.execute("DELETE FROM aliases")
+            self._conn.execute("DELETE FROM headwords")
+            self._conn.commit()
+
+    def _evict(self):
+        if not self.max_entries:
+            return
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE rowid IN ("
+                " SELECT rowid FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._conn.execute(
+                "DELETE FROM aliases WHERE NOT EXISTS ("
+                " SELECT 1 FROM responses r WHERE r.endpoint = aliases.endpoint AND r.word = aliases.canonical)"
+            )
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            aliases = self._conn.execute("SELECT COUNT(*) FROM aliases").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "alias_hits": self.alias_hits,
+            "entries": size,
+            "aliases": aliases,
+        }
+
+_response_cache = None
+_translation_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """Mở cache phản hồi ở lần dùng đầu tiên (import uk_core không tạo file trong thư mục hiện tại)."""
+    global _response_cache
+    with _cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(CACHE_FILE)
+        return _response_cache
+
+# ====== TRANSLATION CACHE (LRU trong RAM + bộ nhớ dịch trên đĩa) ======
+TRANSLATION_MEMORY_SIZE = 2000
+
+class TranslationCache:
+    """Bộ nhớ dịch khóa theo (source, target, text): LRU trong RAM, dự phòng bằng bảng SQLite.
+
+    Chỉ lưu bản dịch thành công; bản dịch lỗi (trả về tiếng Anh) không bao giờ được đưa vào.
+    """
+
+    def __init__(self, path, memory_size=TRANSLATION_MEMORY_SIZE):
+        self.memory_size = memory_size
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " source TEXT NOT NULL,"
+            " target TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " translated TEXT NOT NULL,"
+            " PRIMARY KEY (source, target, text))"
+        )
+        self._conn.commit()
+
+    def _remember(self, key, translated):
+        self._memory[key] = translated
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, source, target, text):
+        key = (source, target, text)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+            row = self._conn.execute(
+                "SELECT translated FROM translations WHERE source = ? AND target = ? AND text = ?",
+                key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, source, target, text, translated):
+        key = (source, target, text)
+        with self._lock:
+            self._remember(key, translated)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (source, target, text, translated) VALUES (?, ?, ?, ?)",
+                (source, target, text, translated)
+            )
+            self._conn.commit()
+
+    def stats(self):
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+def get_translation_cache():
+    """Mở bộ nhớ dịch ở lần dùng đầu tiên."""
+    global _translation_cache
+    with _cache_lock:
+        if _translation_cache is None:
+            _translation_cache = TranslationCache(CACHE_FILE)
+        return _translation_cache
+
+# ====== OFFLINE DICTIONARY (file dump đã import, đọc qua mmap) ======
+# python uk_core.py import-dict collegiate_dump.json
+# python uk_core.py import-dict words.tsv --endpoint collegiate
+#
+# Định dạng file: header | bảng offset (sắp theo từ khóa UTF-8) | các bản ghi (từ khóa + JSON các mục)
+#   header  = magic, số từ khóa
+#   mỗi dòng bảng offset = (offset bản ghi, độ dài từ khóa, độ dài JSON)
+# Tra từ = tìm nhị phân trên bảng offset, chỉ đọc vài trang của file chứ không nạp cả file vào RAM.
+OFFLINE_DICT_FILES = {
+    "collegiate": "offline_collegiate.ukd",
+    "thesaurus": "offline_thesaurus.ukd",
+}
+OFFLINE_MAGIC = b"UKDICT1\0"
+OFFLINE_HEADER = struct.Struct("<8sI")
+OFFLINE_SLOT = struct.Struct("<QII")
+
+class OfflineDictionary:
+    """Từ điển chỉ đọc: get(word) trả về danh sách mục giống phản hồi API, None nếu không có."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path}: file rỗng")
+        magic, self.count = OFFLINE_HEADER.unpack_from(self._mm, 0)
+        if magic != OFFLINE_MAGIC:
+            self.close()
+            raise ValueError(f"{path}: không phải file từ điển offline")
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self.count
+
+    def _slot(self, i):
+        return OFFLINE_SLOT.unpack_from(self._mm, OFFLINE_HEADER.size + i * OFFLINE_SLOT.size)
+
+    def _key(self, i):
+        offset, key_len, _ = self._slot(i)
+        return self._mm[offset:offset + key_len]
+
+    def _find(self, key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def get(self, word):
+        key = normalize_word(word).encode("utf-8")
+        i = self._find(key)
+        if i < self.count:
+            offset, key_len, data_len = self._slot(i)
+            if self._mm[offset:offset + key_len] == key:
+                self.hits += 1
+                start = offset + key_len
+                return json.loads(self._mm[start:start + data_len])
+        self.misses += 1
+        return None
+
+    def __contains__(self, word):
+        key = normalize_word(word).encode("utf-8")
+        i = self._find(key)
+        return i < self.count and self._key(i) == key
+
+    def keys(self):
+        """Mọi từ khóa theo thứ tự đã sắp xếp."""
+        for i in range(self.count):
+            yield self._key(i).decode("utf-8")
+
+    def stats(self):
+        return {"words": self.count, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+def offline_headword(entry_data):
+    """Từ khóa của một mục: meta.id bỏ hậu tố ':1', hoặc hwi.hw bỏ dấu tách âm tiết '*'."""
+    meta_id = entry_data.get("meta", {}).get("id", "")
+    word = meta_id.split(":")[0] if meta_id else entry_data.get("hwi", {}).get("hw", "").replace("*", "")
+    return normalize_word(word)
+
+def _read_dump_entries(path):
+    """Đọc dump: JSON (danh sách mục / {từ: [mục]}), JSON lines (mỗi dòng một mục) hoặc TSV (từ, loại từ, định nghĩa)."""
+    if path.lower().endswith((".tsv", ".txt")):
+        grouped = OrderedDict()
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.reader(f, delimiter="\t"):
+                if len(row) < 3 or not row[0].strip() or row[0].startswith("#"):
+                    continue
+                hw, fl, definition = row[0].strip(), row[1].strip(), row[2].strip()
+                grouped.setdefault((hw, fl), []).append(definition)
+        for (hw, fl), defs in grouped.items():
+            yield {"meta": {"id": hw, "stems": [hw]}, "hwi": {"hw": hw}, "fl": fl, "shortdef": defs}
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        data = json.load(f)
+    if isinstance(data, dict):
+        for entries in data.values():
+            yield from entries
+    else:
+        yield from data
+
+def import_dictionary(source_path, output_path):
+    """Chuyển dump từ điển sang định dạng offline, trả về số từ khóa. Ghi qua file tạm rồi mới thay file cũ."""
+    grouped = {}
+    for entry_data in _read_dump_entries(source_path):
+        if not isinstance(entry_data, dict):
+            continue
+        key = offline_headword(entry_data)
+        if key:
+            grouped.setdefault(key.encode("utf-8"), []).append(entry_data)
+
+    # API trả cụm động từ ("run across") kèm trong phản hồi của từ đầu ("run"), nên chép thêm vào đó
+    # để lookup_phrasal("run") vẫn tìm thấy khi tra offline. Dump không có mục của chính từ đầu thì
+    # không tạo khóa mới: bản ghi chỉ có cụm sẽ che mất nghĩa thật, tra "run" phải đi tiếp tới cache / API
+    for key in [k for k in grouped if b" " in k]:
+        first = grouped.get(key.split(b" ", 1)[0])
+        if first is None:
+            continue
+        ids = {entry.get("meta", {}).get("id") for entry in first}
+        for entry in grouped[key]:
+            entry_id = entry.get("meta", {}).get("id")
+            if entry_id not in ids:
+                ids.add(entry_id)
+                first.append(entry)
+
+    keys = sorted(grouped)
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(OFFLINE_HEADER.pack(OFFLINE_MAGIC, len(keys)))
+        offset = OFFLINE_HEADER.size + len(keys) * OFFLINE_SLOT.size
+        payloads = []
+        for key in keys:
+            payload = json.dumps(grouped[key], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            f.write(OFFLINE_SLOT.pack(offset, len(key), len(payload)))
+            payloads.append(payload)
+            offset += len(key) + len(payload)
+        for key, payload in zip(keys, payloads):
+            f.write(key)
+            f.write(payload)
+    os.replace(tmp_path, output_path)
+    reset_offline_dicts()
+    return len(keys)
+
+_offline_dicts = {}
+_offline_lock = threading.Lock()
+
+def get_offline_dict(endpoint):
+    """Mở từ điển offline của endpoint ở lần dùng đầu; None nếu chưa import."""
+    with _offline_lock:
+        if endpoint not in _offline_dicts:
+            path = OFFLINE_DICT_FILES.get(endpoint)
+            offline = None
+            if path and os.path.exists(path):
+                try:
+                    offline = OfflineDictionary(path)
+                except (OSError, ValueError, struct.error):
+                    offline = None
+            _offline_dicts[endpoint] = offline
+        return _offline_dicts[endpoint]
+
+def reset_offline_dicts():
+    """Đóng các file đang mở để lần tra sau đọc lại (sau khi import)."""
+    with _offline_lock:
+        for offline in _offline_dicts.values():
+            if offline is not None:
+                offline.close()
+        _offline_dicts.clear()
+
+def import_dict_main(argv):
+    parser = argparse.ArgumentParser(prog="uk_core.py import-dict",
+                                     description="Import dump từ điển (JSON / JSONL / TSV) để tra offline.")
+    parser.add_argument("source", help="File dump: .json, .jsonl hoặc .tsv (từ<TAB>loại từ<TAB>định nghĩa)")
+    parser.add_argument("--endpoint", choices=sorted(OFFLINE_DICT_FILES), default="collegiate")
+    parser.add_argument("--output", "-o", help="Mặc định: " + ", ".join(OFFLINE_DICT_FILES.values()))
+    args = parser.parse_args(argv)
+
+    output = args.output or OFFLINE_DICT_FILES[args.endpoint]
+    start = time.perf_counter()
+    count = import_dictionary(args.source, output)
+    print(f"Đã import {count} từ vào {output} ({os.path.getsize(output) / 1024:.0f} KB, "
+          f"{time.perf_counter() - start:.1f}s)", file=sys.stderr)
+    return 0
+
+# ====== WORKER POOL (số thread cố định, hàng đợi theo mức ưu tiên) ======
+WORKER_COUNT = 4
+WORKER_QUEUE_SIZE = 100          # tổng số việc chờ tối đa; đầy thì bỏ việc kém ưu tiên nhất hoặc từ chối
+PRIORITY_USER = 0                # lượt tra người dùng đang chờ nhìn thấy
+PRIORITY_SPECULATIVE = 1         # tải kèm endpoint còn lại của từ đang tra
+PRIORITY_BACKGROUND = 2          # nạp dữ liệu, dựng chỉ mục
+PRIORITY_PREFETCH = 3            # tải trước từ liên quan
+PRIORITY_NAMES = {
+    PRIORITY_USER: "user",
+    PRIORITY_SPECULATIVE: "speculative",
+    PRIORITY_BACKGROUND: "background",
+    PRIORITY_PREFETCH: "prefetch",
+}
+# Số thread tối đa mỗi mức được chiếm cùng lúc, để việc nền không giữ hết thread của lượt tra
+PRIORITY_CONCURRENCY = {PRIORITY_BACKGROUND: 2, PRIORITY_PREFETCH: 1}
+
+class WorkerPool:
+    """Thread pool dùng chung cho mọi việc nền, thay cho việc tạo threading.Thread mỗi lần.
+
+    Việc được lấy theo mức ưu tiên (số nhỏ trước), FIFO trong cùng mức. Khi hàng đợi đầy, việc mới
+    ưu tiên hơn sẽ đẩy việc mới nhất của mức kém nhất ra (future bị hủy); nếu không thì submit chờ
+    (block=True) hoặc ném queue.Full. Thread chỉ được tạo ở lần submit đầu tiên.
+    """
+
+    def __init__(self, workers=WORKER_COUNT, max_queue=WORKER_QUEUE_SIZE, concurrency=None):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.concurrency = dict(PRIORITY_CONCURRENCY if concurrency is None else concurrency)
+        self._cond = threading.Condition()
+        self._queues = {priority: deque() for priority in PRIORITY_NAMES}
+        self._running = {priority: 0 for priority in PRIORITY_NAMES}
+        self._queued = 0
+        self._threads = []
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.rejected = 0
+        self._after_job = []
+        self._waits = {priority: deque(maxlen=TRACE_STAGE_SAMPLES) for priority in PRIORITY_NAMES}
+
+    def submit(self, fn, *args, priority=PRIORITY_USER, block=True, timeout=None, **kwargs):
+        future = Future()
+        job = (future, fn, args, kwargs, time.perf_counter())
+        evicted = []
+        with self._cond:
+            if not self._threads:
+                self._start_threads()
+            while self._queued >= self.max_queue and not self._evict_below(priority, evicted):
+                if not block:
+                    self.rejected += 1
+                    raise queue.Full(f"Hàng đợi việc nền đầy ({self.max_queue})")
+                if not self._cond.wait(timeout):
+                    self.rejected += 1
+                    raise queue.Full(f"Hàng đợi việc nền đầy ({self.max_queue})")
+            self._queues[priority].append(job)
+            self._queued += 1
+            self.submitted += 1
+            self._cond.notify()
+        # Hủy ngoài khóa: callback của việc bị bỏ có thể submit lại
+        for dropped in evicted:
+            dropped.cancel()
+        return future
+
+    def call_after_next_job(self, fn):
+        """Gọi fn() (từ worker, nên fn không được chờ hàng đợi) khi việc kế tiếp chạy xong, để xếp lại việc bị
+        từ chối mà không cần thread hẹn giờ.
+
+        Trả về False nếu pool đang rảnh (không việc nào sẽ xong): người gọi nên thử lại ngay.
+        """
+        with self._cond:
+            if not self._queued and not any(self._running.values()):
+                return False
+            self._after_job.append(fn)
+            return True
+
+    def _evict_below(self, priority, evicted):
+        """Bỏ việc mới nhất của mức kém ưu tiên nhất (kém hơn priority) để lấy chỗ; future của nó được thêm vào evicted."""
+        for worse in sorted(self._queues, reverse=True):
+            if worse <= priority:
+                return False
+            if self._queues[worse]:
+                future = self._queues[worse].pop()[0]
+                self._queued -= 1
+                self.dropped += 1
+                evicted.append(future)
+                return True
+        return False
+
+    def _start_threads(self):
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"uk-worker-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_job(self):
+        for priority in sorted(self._queues):
+            limit = self.concurrency.get(priority)
+            if self._queues[priority] and (limit is None or self._running[priority] < limit):
+                self._queued -= 1
+                self._running[priority] += 1
+                return priority, self._queues[priority].popleft()
+        return None, None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                priority, job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    priority, job = self._next_job()
+                self._cond.notify_all()   # có chỗ trống cho submit đang chờ
+            future, fn, args, kwargs, submitted_at = job
+            wait = time.perf_counter() - submitted_at
+            self._waits[priority].append(wait)
+            tracer.record_span(f"queue_wait.{PRIORITY_NAMES[priority]}", submitted_at, wait)
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+            with self._cond:
+                self._running[priority] -= 1
+                self.completed += 1
+                self._cond.notify_all()
+                after_job, self._after_job = self._after_job, []
+            for fn in after_job:
+                try:
+                    fn()
+                except Exception:
+                    pass
+
+    def stats(self):
+        with self._cond:
+            queued = {PRIORITY_NAMES[p]: len(q) for p, q in self._queues.items()}
+            running = {PRIORITY_NAMES[p]: n for p, n in self._running.items()}
+            waits = {p: sorted(w) for p, w in self._waits.items()}
+            stats = {
+                "workers": self.workers,
+                "queued": self._queued,
+                "queued_by_priority": queued,
+                "running_by_priority": running,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "dropped": self.dropped,
+                "rejected": self.rejected,
+            }
+        stats["wait_ms"] = {
+            PRIORITY_NAMES[p]: {"p50": percentile(w, 0.5) * 1000, "p95": percentile(w, 0.95) * 1000}
+            for p, w in waits.items() if w
+        }
+        return stats
+
+worker_pool = WorkerPool()
+
+# ====== PREFETCH (tải song song & tải trước từ liên quan) ======
+PREFETCH_RELATED = False    # True = tải trước stems / gợi ý ở chế độ nền (tốn thêm tối đa PREFETCH_MAX_WORDS request mỗi lần tra)
+PREFETCH_MAX_WORDS = 5      # Số từ liên quan tối đa mỗi lần tra
+
+def companion_endpoints(url_template):
+    """Các endpoint còn lại cần tải kèm khi tra một từ (nghĩa <-> đồng/trái nghĩa)."""
+    current = endpoint_name(url_template)
+    return [(tpl, key) for tpl, key in ((API_URL_DICT, DICTIONARY_KEY), (API_URL_THES, THESAURUS_KEY))
+            if endpoint_name(tpl) != current]
+
+def warm_fetch(word, url_template, key):
+    """Tải vào cache, bỏ qua lỗi (chỉ để lần bấm sau hiển thị ngay)."""
+    try:
+        fetch_api(word, url_template, key)
+    except Exception:
+        pass
+
+def fan_out(word, url_template):
+    """Bắn song song request tới các endpoint còn lại ngay khi bắt đầu tra (hàng đợi đầy thì bỏ qua)."""
+    for tpl, key in companion_endpoints(url_template):
+        if not get_response_cache().contains(endpoint_name(tpl), word):
+            try:
+                worker_pool.submit(warm_fetch, word, tpl, key, priority=PRIORITY_SPECULATIVE, block=False)
+            except queue.Full:
+                pass
+
+def related_words(word, data, limit=PREFETCH_MAX_WORDS):
+    """Lấy các từ liên quan từ phản hồi API: danh sách gợi ý, hoặc meta.stems của các mục."""
+    if not data:
+        return []
+    if isinstance(data[0], str):
+        candidates = data
+    else:
+        candidates = [stem for entry_data in data if isinstance(entry_data, dict)
+                      for stem in entry_data.get("meta", {}).get("stems", [])]
+    seen = {normalize_word(word)}
+    result = []
+    for candidate in candidates:
+        key = normalize_word(candidate)
+        if key and key not in seen:
+            seen.add(key)
+            result.append(candidate)
+            if len(result) >= limit:
+                break
+    return result
+
+class Prefetcher:
+    """Tải trước ưu tiên thấp qua worker_pool (mỗi lúc chỉ một việc prefetch, luôn nhường lượt tra),
+    bỏ qua từ đã gửi hoặc đã có trong cache.
+    """
+
+    def __init__(self, pool=None):
+        self.pool = pool or worker_pool
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def submit(self, words, url_template, key):
+        endpoint = endpoint_name(url_template)
+        with self._lock:
+            if len(self._seen) > 5000:
+                self._seen.clear()
+            for word in words:
+                seen_key = (endpoint, normalize_word(word))
+                if seen_key in self._seen:
+                    continue
+                try:
+                    self.pool.submit(self._fetch, word, url_template, key, priority=PRIORITY_PREFETCH, block=False)
+                except queue.Full:
+                    break
+                self._seen.add(seen_key)
+
+    @staticmethod
+    def _fetch(word, url_template, key):
+        if not get_response_cache().contains(endpoint_name(url_template), word):
+            warm_fetch(word, url_template, key)
+
+prefetcher = Prefetcher()
+
+def prefetch_related(word, data, url_template, key):
+    """Tải trước các từ liên quan nếu bật PREFETCH_RELATED (đọc lúc gọi, đổi được khi đang chạy)."""
+    if PREFETCH_RELATED:
+        prefetcher.submit(related_words(word, data), url_template, key)
+
+# ====== PARSE PHẢN HỒI API ======
+def is_suggestion_list(data):
+    """API trả về danh sách chuỗi gợi ý khi không tìm thấy từ."""
+    return bool(data) and isinstance(data[0], str)
+
+@timed("parse")
+def parse_meaning(data):
+    """[{hw, fl, definitions: [en, ...]}] từ phản hồi collegiate."""
+    return [
+        {
+            "hw": entry_data.get("hwi", {}).get("hw", ""),
+            "fl": entry_data.get("fl", ""),
+            "definitions": list(entry_data.get("shortdef", [])),
+        }
+        for entry_data in data
+    ]
+
+@timed("parse")
+def parse_syn_ant(data):
+    """[{hw, definition, synonyms, antonyms}] từ phản hồi thesaurus (chỉ lấy nhóm đầu tiên như giao diện)."""
+    entries = []
+    for entry_data in data:
+        meta = entry_data.get("meta", {})
+        syns = meta.get("syns", [])
+        ants = meta.get("ants", [])
+        defs = entry_data.get("shortdef", [])
+        entries.append({
+            "hw": entry_data.get("hwi", {}).get("hw", ""),
+            "definition": defs[0] if defs else "",
+            "synonyms": list(syns[0]) if syns else [],
+            "antonyms": list(ants[0]) if ants else [],
+        })
+    return entries
+
+@timed("parse")
+def parse_phrasal(data):
+    """[{id, definitions: [en, ...]}] cho các mục có meta.id gồm nhiều từ."""
+    return [
+        {"id": entry_data.get("meta", {}).get("id", ""), "definitions": list(entry_data.get("shortdef", []))}
+        for entry_data in data
+        if " " in entry_data.get("meta", {}).get("id", "")
+    ]
+
+# ====== CORE LOOKUP API (không cần giao diện) ======
+def _lookup(word, kind, url_template, key, parse, translate):
+    trace = Trace(kind, word=word)
+    try:
+        with trace.activate():
+            return _lookup_traced(word, kind, url_template, key, parse, translate)
+    finally:
+        trace.finish()
+
+def _lookup_traced(word, kind, url_template, key, parse, translate):
+    data = fetch_api(word, url_template, key)
+    result = {"word": word, "kind": kind}
+    if not data:
+        result["status"] = "not_found"
+        return result
+    if is_suggestion_list(data):
+        result["status"] = "suggestions"
+        result["suggestions"] = list(data)
+        return result
+    entries = parse(data)
+    if translate:
+        texts = [d for e in entries for d in e.get("definitions", [])]
+        vis = iter(translate_batch(texts))
+        for e in entries:
+            if "definitions" in e:
+                e["definitions"] = [{"en": d, "vi": next(vis)} for d in e["definitions"]]
+    result["status"] = "ok" if entries else "not_found"
+    result["entries"] = entries
+    return result
+
+def lookup_meaning(word, translate=True):
+    """Tra nghĩa: {word, kind, status, entries: [{hw, fl, definitions: [{en, vi}]}] | suggestions}."""
+    return _lookup(word, "meaning", API_URL_DICT, DICTIONARY_KEY, parse_meaning, translate)
+
+def lookup_syn_ant(word):
+    """Tra đồng / trái nghĩa: {word, kind, status, entries: [{hw, definition, synonyms, antonyms}]}."""
+    return _lookup(word, "syn_ant", API_URL_THES, THESAURUS_KEY, parse_syn_ant, False)
+
+def lookup_phrasal(word, translate=True):
+    """Tra phrasal verb: {word, kind, status, entries: [{id, definitions: [{en, vi}]}]}."""
+    return _lookup(word, "phrasal", API_URL_DICT, DICTIONARY_KEY, parse_phrasal, translate)
+
+LOOKUP_KINDS = {
+    "meaning": lookup_meaning,
+    "syn_ant": lookup_syn_ant,
+    "phrasal": lookup_phrasal,
+}
+
+# ====== ESSAY & FLASHCARD DATA ======
+ESSAY_FILE = "essays.json"          # Bộ bài mẫu gốc, chỉ đọc một lần để nạp vào essays.db
+ESSAY_DB_FILE = "essays.db"
+
+ESSAY_PAGE_SIZE = 50     # số bài đọc mỗi lần khi duyệt toàn bộ
+
+class EssayStore:
+    """Lưu bài văn mỗi bài một dòng SQLite. Trong RAM chỉ giữ danh sách tiêu đề;
+    nội dung bài chỉ được đọc khi mở bài, sửa / xóa chỉ ghi đúng dòng của bài đó.
+    """
+
+    def __init__(self, path, seed_json=ESSAY_FILE):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS essays ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " title TEXT NOT NULL UNIQUE,"
+            " body TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+        self._seed_from_json(seed_json)
+        self._titles = [row[0] for row in self._conn.execute("SELECT title FROM essays ORDER BY id")]
+
+    def _seed_from_json(self, json_path):
+        done = self._conn.execute("SELECT value FROM meta WHERE key = 'json_seeded'").fetchone()
+        if done:
+            return
+        data = {}
+        if json_path and os.path.exists(json_path):
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except json.JSONDecodeError:
+                data = {}
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO essays (title, body) VALUES (?, ?)", list(data.items())
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_seeded', '1')")
+
+    def titles(self):
+        with self._lock:
+            return list(self._titles)
+
+    def __contains__(self, title):
+        with self._lock:
+            return title in self._titles
+
+    @timed("essay.get")
+    def get(self, title):
+        """Đọc nội dung một bài (None nếu không có)."""
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM essays WHERE title = ?", (title,)).fetchone()
+        return row[0] if row else None
+
+    def iter_all(self, batch_size=ESSAY_PAGE_SIZE):
+        """Duyệt (title, body) của mọi bài theo thứ tự thêm vào, đọc từng trang theo id nên không giữ tất cả trong RAM."""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, title, body FROM essays WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            for _, title, body in rows:
+                yield title, body
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    @timed("essay.save")
+    def save(self, title, body):
+        """Thêm bài mới hoặc cập nhật nội dung bài đã có."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO essays (title, body) VALUES (?, ?)"
+                " ON CONFLICT(title) DO UPDATE SET body = excluded.body",
+                (title, body)
+            )
+            if title not in self._titles:
+                self._titles.append(title)
+
+    @timed("essay.delete")
+    def delete(self, title):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM essays WHERE title = ?", (title,))
+            if title in self._titles:
+                self._titles.remove(title)
+
+_essay_store = None
+_essay_index = None
+_data_lock = threading.Lock()
+
+def get_essay_store():
+    """Mở kho bài văn ở lần dùng đầu tiên (không làm chậm lúc khởi động)."""
+    global _essay_store
+    with _data_lock:
+        if _essay_store is None:
+            _essay_store = EssayStore(ESSAY_DB_FILE)
+        return _essay_store
+
+# ====== ESSAY SEARCH INDEX (chỉ mục ngược, không phân biệt dấu) ======
+ESSAY_TITLE_BONUS = 5.0     # Điểm cộng khi từ khóa nằm trong tiêu đề
+
+def fold_text(text):
+    """Chữ thường, bỏ dấu tiếng Việt (đ -> d) để 'dai ly' khớp 'đại lý'."""
+    text = text.lower().replace("đ", "d")
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+def tokenize(text):
+    return re.findall(r"\w+", fold_text(text))
+
+class EssayIndex:
+    """Chỉ mục ngược token -> {title: tần suất} cho tiêu đề và nội dung bài.
+
+    Dựng một lần (có thể ở thread nền) rồi cập nhật từng bài qua update() / remove().
+    Token cuối của câu truy vấn được so khớp theo tiền tố để lọc ngay khi đang gõ.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.ready = False
+        self._lock = threading.Lock()
+        self._postings = {}      # token -> {title: tf}
+        self._doc_tokens = {}    # title -> set(token) để gỡ bài khỏi chỉ mục
+        self._title_tokens = {}  # title -> set(token) trong tiêu đề
+        self._vocab = []         # token đã sắp xếp, dùng bisect cho tìm theo tiền tố
+        self._building = False
+        self._touched = set()    # bài được update() / remove() trong lúc đang dựng: bản dựng không ghi đè
+
+    @timed("essay.index_build")
+    def ensure_built(self):
+        with self._lock:
+            if self.ready or self._building:
+                return
+            self._building = True
+            self._touched.clear()
+        for title, body in self.store.iter_all():
+            self._index(title, body, from_build=True)
+        with self._lock:
+            self.ready = True
+            self._building = False
+            self._touched.clear()
+
+    def _remove_locked(self, title):
+        for token in self._doc_tokens.pop(title, ()):
+            docs = self._postings.get(token)
+            if docs is None:
+                continue
+            docs.pop(title, None)
+            if not docs:
+                del self._postings[token]
+                i = bisect.bisect_left(self._vocab, token)
+                if i < len(self._vocab) and self._vocab[i] == token:
+                    del self._vocab[i]
+        self._title_tokens.pop(title, None)
+
+    def update(self, title, body):
+        """Thêm hoặc cập nhật một bài trong chỉ mục."""
+        self._index(title, body)
+
+    def _index(self, title, body, from_build=False):
+        title_tokens = tokenize(title)
+        counts = {}
+        for token in title_tokens + tokenize(body):
+            counts[token] = counts.get(token, 0) + 1
+        with self._lock:
+            if from_build:
+                # Bài đã được sửa / xóa sau khi bản dựng đọc nó: giữ bản mới hơn
+                if title in self._touched:
+                    return
+            elif self._building:
+                self._touched.add(title)
+            self._remove_locked(title)
+            for token, tf in counts.items():
+                docs = self._postings.get(token)
+                if docs is None:
+                    docs = self._postings[token] = {}
+                    bisect.insort(self._vocab, token)
+                docs[title] = tf
+            self._doc_tokens[title] = set(counts)
+            self._title_tokens[title] = set(title_tokens)
+
+    def remove(self, title):
+        with self._lock:
+            if self._building:
+                self._touched.add(title)
+            self._remove_locked(title)
+
+    def _matches(self, token, prefix):
+        if not prefix:
+            return [token] if token in self._postings else []
+        start = bisect.bisect_left(self._vocab, token)
+        end = bisect.bisect_left(self._vocab, token + "\uffff")
+        return self._vocab[start:end]
+
+    @timed("essay.search")
+    def search(self, query):
+        """Trả về danh sách tiêu đề khớp mọi từ khóa, xếp theo điểm (tf-idf + ưu tiên tiêu đề)."""
+        titles = self.store.titles()
+        tokens = tokenize(query)
+        if not tokens:
+            return titles
+        if not self.ready:
+            # Chỉ mục chưa dựng xong: tạm lọc theo tiêu đề
+            folded = fold_text(query).strip()
+            return [t for t in titles if folded in fold_text(t)]
+
+        with self._lock:
+            total_docs = max(len(self._doc_tokens), 1)
+            scores = None
+            for n, token in enumerate(tokens):
+                is_last = n == len(tokens) - 1
+                token_scores = {}
+                for match in self._matches(token, prefix=is_last):
+                    docs = self._postings[match]
+                    idf = math.log(1 + total_docs / len(docs))
+                    for title, tf in docs.items():
+                        bonus = ESSAY_TITLE_BONUS if match in self._title_tokens.get(title, ()) else 0.0
+                        token_scores[title] = max(token_scores.get(title, 0.0), tf * idf + bonus)
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {t: sc + token_scores[t] for t, sc in scores.items() if t in token_scores}
+                if not scores:
+                    return []
+
+        order = {title: i for i, title in enumerate(titles)}
+        return sorted(scores, key=lambda t: (-scores[t], order.get(t, len(order))))
+
+def get_essay_index():
+    global _essay_index
+    store = get_essay_store()
+    with _data_lock:
+        if _essay_index is None:
+            _essay_index = EssayIndex(store)
+        return _essay_index
+
+# ====== ESSAY TRANSLATION (chia đoạn, dịch song song có giới hạn) ======
+ESSAY_TRANSLATE_CONCURRENCY = 2     # số khúc của một bài được xếp vào worker_pool cùng lúc
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+")
+
+def split_paragraphs(text):
+    """Các đoạn (dòng không rỗng) của bài văn."""
+    return [line.strip() for line in (text or "").splitlines() if line.strip()]
+
+def split_for_translation(paragraph, max_chars=TRANSLATE_CHUNK_CHARS):
+    """Chia một đoạn quá dài thành các khúc <= max_chars theo ranh giới câu (câu quá dài thì cắt ở khoảng trắng)."""
+    if len(paragraph) <= max_chars:
+        return [paragraph]
+    pieces, current = [], ""
+    for sentence in _SENTENCE_END_RE.split(paragraph):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].strip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+def translate_essay(text, on_paragraph=None, cancel=None, concurrency=ESSAY_TRANSLATE_CONCURRENCY, wait=True):
+    """Dịch cả bài theo từng đoạn, trả về danh sách bản dịch khớp với split_paragraphs(text).
+
+    Mỗi khúc đi qua safe_translate (cache theo nội dung) nên khi sửa bài chỉ các đoạn đã đổi
+    phải dịch lại. Khúc chưa có trong cache được xếp vào worker_pool ở mức PRIORITY_BACKGROUND,
+    mỗi lúc tối đa `concurrency` khúc (xong khúc này mới xếp khúc tiếp), nên lượt tra vẫn được chạy trước.
+    on_paragraph(i, vi) được gọi ngay khi đoạn i dịch xong (đoạn có sẵn trong cache từ thread gọi hàm,
+    các đoạn còn lại từ worker). wait=False thì trả về ngay (gọi được từ luồng Tk), các đoạn chưa dịch
+    trong kết quả vẫn là tiếng Anh. Khi cancel bị hủy, các khúc chưa chạy được bỏ qua.
+
+    Span "essay.translate" đo từ lúc gọi tới lần on_paragraph cuối (không ghi khi bị hủy), kể cả khi wait=False.
+    """
+    started = time.perf_counter()
+    trace = current_trace()
+    last_done = [started]
+    paragraphs = split_paragraphs(text)
+    results = list(paragraphs)
+    pieces = [split_for_translation(p) for p in paragraphs]
+    done_pieces = [[None] * len(parts) for parts in pieces]
+    remaining = [len(parts) for parts in pieces]
+    lock = threading.Lock()
+    pending = deque()
+    for i, parts in enumerate(pieces):
+        for j, piece in enumerate(parts):
+            cached = get_translation_cache().get(TRANSLATE_SOURCE, TRANSLATE_TARGET, piece)
+            if cached is None:
+                pending.append((i, j, piece))
+            else:
+                done_pieces[i][j] = cached
+                remaining[i] -= 1
+        if remaining[i] == 0:
+            results[i] = " ".join(done_pieces[i])
+            if on_paragraph:
+                on_paragraph(i, results[i])
+            last_done[0] = time.perf_counter()
+
+    in_flight = [0]
+    finished = threading.Event()
+
+    def finish():
+        # Gọi khi đang giữ lock: việc cuối đã xong (hoặc bị hủy)
+        if finished.is_set():
+            return
+        finished.set()
+        if paragraphs and not (cancel is not None and cancel.cancelled):
+            tracer.record_span("essay.translate", started, last_done[0] - started, trace)
+
+    def run(i, j, piece):
+        try:
+            if cancel is not None and cancel.cancelled:
+                return
+            vi = safe_translate(piece)
+            with lock:
+                done_pieces[i][j] = vi
+                remaining[i] -= 1
+                if remaining[i]:
+                    return
+                results[i] = " ".join(done_pieces[i])
+            if on_paragraph and not (cancel is not None and cancel.cancelled):
+                on_paragraph(i, results[i])
+            with lock:
+                last_done[0] = max(last_done[0], time.perf_counter())
+        finally:
+            with lock:
+                in_flight[0] -= 1
+            launch()
+
+    def retry_later(job):
+        # Hàng đợi đầy / việc bị bỏ để nhường lượt tra: xếp lại khi pool xong việc kế tiếp
+        with lock:
+            pending.appendleft(job)
+            in_flight[0] -= 1
+        if not worker_pool.call_after_next_job(launch):
+            launch()
+
+    def launch():
+        while True:
+            with lock:
+                if not pending or (cancel is not None and cancel.cancelled) or in_flight[0] >= concurrency:
+                    if in_flight[0] == 0 and (not pending or (cancel is not None and cancel.cancelled)):
+                        finish()
+                    return
+                job = pending.popleft()
+                in_flight[0] += 1
+            try:
+                future = worker_pool.submit(run, *job, priority=PRIORITY_BACKGROUND, block=False)
+            except queue.Full:
+                retry_later(job)
+                return
+            future.add_done_callback(lambda f, job=job: f.cancelled() and retry_later(job))
+
+    launch()
+    if wait:
+        finished.wait()
+    return results
+
+# ====== FLASHCARD STORE ======
+FLASHCARD_FILE = "flashcards.json"      # Định dạng cũ: chỉ dùng để chuyển dữ liệu một lần và xuất ra
+FLASHCARD_DB_FILE = "flashcards.db"
+
+# Trạng thái ôn tập lưu cùng thẻ (SM-2)
+REVIEW_COLUMNS = (
+    ("ease", "REAL NOT NULL DEFAULT 2.5"),
+    ("interval_days", "REAL NOT NULL DEFAULT 0"),
+    ("repetitions", "INTEGER NOT NULL DEFAULT 0"),
+    ("due", "REAL NOT NULL DEFAULT 0"),
+)
+REVIEW_BATCH_SIZE = 50           # số thẻ đến hạn nạp mỗi lần vào phiên ôn
+REVIEW_MIN_EASE = 1.3
+REVIEW_RELEARN_SECONDS = 60      # thẻ trả lời sai được hỏi lại trong phiên sau chừng này giây
+GRADE_AGAIN, GRADE_HARD, GRADE_GOOD, GRADE_EASY = 1, 3, 4, 5   # điểm SM-2 (0-5) của 4 nút trả lời
+FLASHCARD_IO_BATCH = 500         # số dòng mỗi lô khi nhập / xuất (một transaction, một lượt dịch)
+
+class Card:
+    __slots__ = ("id", "word", "meaning", "ease", "interval_days", "repetitions", "due")
+
+    def __init__(self, id, word, meaning, ease=2.5, interval_days=0.0, repetitions=0, due=0.0):
+        self.id = id
+        self.word = word
+        self.meaning = meaning
+        self.ease = ease
+        self.interval_days = interval_days
+        self.repetitions = repetitions
+        self.due = due
+
+def sm2_schedule(card, quality, now=None):
+    """Cập nhật ease / interval / due của thẻ theo SM-2 với điểm quality (0-5)."""
+    now = time.time() if now is None else now
+    if quality < 3:
+        card.repetitions = 0
+        card.interval_days = 1
+    else:
+        card.repetitions += 1
+        if card.repetitions == 1:
+            card.interval_days = 1
+        elif card.repetitions == 2:
+            card.interval_days = 6
+        else:
+            card.interval_days = round(card.interval_days * card.ease, 1)
+    card.ease = max(REVIEW_MIN_EASE, card.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    card.due = now + card.interval_days * 86400
+    return card
+
+class FlashcardStore:
+    """Lưu flashcard trong SQLite: thêm / xóa từng thẻ O(1), mỗi thao tác là một transaction.
+
+    Lần đầu mở sẽ tự chuyển dữ liệu từ flashcards.json cũ (nếu có).
+    """
+
+    def __init__(self, path, legacy_json=FLASHCARD_FILE):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # FULL: mỗi thẻ đã commit được fsync ngay, không mất khi mất điện (mỗi lần ghi chỉ một dòng nên gần như không chậm hơn)
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS flashcards ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " word TEXT NOT NULL UNIQUE,"
+            " meaning TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._add_review_columns()
+        self._conn.commit()
+        self._migrate_from_json(legacy_json)
+
+    def _add_review_columns(self):
+        """Thêm cột trạng thái ôn tập (SM-2) cho DB tạo từ phiên bản cũ. Thẻ mới có due = 0: đến hạn ngay."""
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(flashcards)")}
+        for column, ddl in REVIEW_COLUMNS:
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE flashcards ADD COLUMN {column} {ddl}")
+        # Chỉ mục theo (due, id): lấy thẻ đến hạn kế tiếp là O(log n), không quét / sắp xếp cả bộ thẻ
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_flashcards_due ON flashcards (due, id)")
+
+    def _migrate_from_json(self, json_path):
+        done = self._conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+        if done:
+            return
+        data = {}
+        if json_path and os.path.exists(json_path):
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except json.JSONDecodeError:
+                data = {}
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO flashcards (word, meaning) VALUES (?, ?)",
+                list(data.items())
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', '1')")
+
+    @timed("flashcard.load")
+    def load_all(self):
+        """Trả về dict word -> meaning theo thứ tự thêm vào."""
+        with self._lock:
+            rows = self._conn.execute("SELECT word, meaning FROM flashcards ORDER BY id").fetchall()
+        return dict(rows)
+
+    @timed("flashcard.add")
+    def add(self, word, meaning):
+        """Thêm thẻ, hoặc sửa nghĩa nếu từ đã có (giữ nguyên tiến độ ôn tập)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO flashcards (word, meaning) VALUES (?, ?)"
+                " ON CONFLICT(word) DO UPDATE SET meaning = excluded.meaning",
+                (word, meaning)
+            )
+
+    @timed("flashcard.delete")
+    def delete(self, word):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM flashcards WHERE word = ?", (word,))
+
+    def words(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT word FROM flashcards")]
+
+    @timed("flashcard.add_many")
+    def add_many(self, pairs):
+        """Thêm nhiều thẻ trong một transaction; từ đã có thì bỏ qua. Trả về số thẻ thêm được."""
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO flashcards (word, meaning) VALUES (?, ?)", pairs)
+            return self._conn.total_changes - before
+
+    def iter_cards(self, batch_size=FLASHCARD_IO_BATCH):
+        """Duyệt (word, meaning) theo thứ tự thêm vào, đọc từng trang theo id để không giữ cả bộ thẻ trong bộ nhớ."""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, word, meaning FROM flashcards WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            for _, word, meaning in rows:
+                yield word, meaning
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    @timed("flashcard.due")
+    def due_cards(self, now, after=None, limit=REVIEW_BATCH_SIZE):
+        """Các thẻ đến hạn (due <= now) theo thứ tự (due, id), bắt đầu sau con trỏ after=(due, id).
+
+        Phân trang theo con trỏ trên chỉ mục nên mỗi lô chỉ đọc đúng `limit` dòng.
+        """
+        after_due, after_id = after if after else (-1.0, -1)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, word, meaning, ease, interval_days, repetitions, due FROM flashcards"
+                " WHERE due <= ? AND (due > ? OR (due = ? AND id > ?))"
+                " ORDER BY due, id LIMIT ?",
+                (now, after_due, after_due, after_id, limit)
+            ).fetchall()
+        return [Card(*row) for row in rows]
+
+    def count_due(self, now):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM flashcards WHERE due <= ?", (now,)).fetchone()[0]
+
+    @timed("flashcard.review")
+    def save_review(self, card):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE flashcards SET ease = ?, interval_days = ?, repetitions = ?, due = ? WHERE id = ?",
+                (card.ease, card.interval_days, card.repetitions, card.due, card.id)
+            )
+
+    @timed("flashcard.export")
+    def export_json(self, path=FLASHCARD_FILE):
+        """Xuất toàn bộ flashcard ra file JSON (định dạng cũ), ghi qua file tạm để không hỏng file khi lỗi."""
+        data = self.load_all()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, path)
+        return len(data)
+
+class ReviewSession:
+    """Phiên ôn tập: nạp dần thẻ đến hạn theo lô từ chỉ mục (due, id) vào một heap theo due.
+
+    next_card() / answer() là O(log n); mỗi câu trả lời được ghi ngay xuống DB. Thẻ trả lời sai
+    quay lại heap sau REVIEW_RELEARN_SECONDS để hỏi lại trong cùng phiên.
+    """
+
+    def __init__(self, store, batch_size=REVIEW_BATCH_SIZE):
+        self.store = store
+        self.batch_size = batch_size
+        self.started = time.time()
+        self.reviewed = 0
+        self.lapses = 0
+        self._heap = []             # (due trong phiên, id, Card, nạp từ DB?)
+        self._cursor = None         # (due, id) của thẻ cuối đã nạp từ DB
+        self._exhausted = False
+        self._loaded = 0            # thẻ nạp từ DB đang nằm trong heap (không tính thẻ chờ hỏi lại)
+        self._relearn = 0           # thẻ sai đang chờ hỏi lại
+        self._unanswered = set()    # id thẻ nạp từ DB đã lấy ra nhưng chưa trả lời
+        self._due_left = store.count_due(self.started)   # đếm một lần, sau đó trừ dần
+
+    def _refill(self):
+        if self._exhausted:
+            return
+        cards = self.store.due_cards(self.started, self._cursor, self.batch_size)
+        if len(cards) < self.batch_size:
+            self._exhausted = True
+        for card in cards:
+            heapq.heappush(self._heap, (card.due, card.id, card, True))
+        self._loaded += len(cards)
+        if cards:
+            self._cursor = (cards[-1].due, cards[-1].id)
+
+    def next_card(self, now=None):
+        """Thẻ kế tiếp đến hạn, None khi hết (thẻ đang chờ hỏi lại chưa tới giờ cũng tính là hết)."""
+        now = time.time() if now is None else now
+        # Nạp thêm khi thẻ từ DB sắp hết, hoặc đầu heap chỉ còn thẻ chờ hỏi lại chưa tới giờ
+        if self._loaded < self.batch_size // 2 or not (self._heap and self._heap[0][0] <= now):
+            self._refill()
+        if not (self._heap and self._heap[0][0] <= now):
+            return None
+        _, _, card, from_db = heapq.heappop(self._heap)
+        if from_db:
+            self._loaded -= 1
+            self._unanswered.add(card.id)
+        else:
+            self._relearn -= 1
+        return card
+
+    def answer(self, card, quality, now=None):
+        now = time.time() if now is None else now
+        sm2_schedule(card, quality, now)
+        self.store.save_review(card)
+        self.reviewed += 1
+        if card.id in self._unanswered:
+            self._unanswered.discard(card.id)
+            self._due_left = max(0, self._due_left - 1)
+        if quality < 3:
+            self.lapses += 1
+            self._relearn += 1
+            heapq.heappush(self._heap, (now + REVIEW_RELEARN_SECONDS, card.id, card, False))
+        return card
+
+    def relearn_pending(self):
+        """Số thẻ sai đang chờ hỏi lại trong phiên."""
+        return self._relearn
+
+    def remaining(self):
+        """Số thẻ đến hạn chưa ôn (tính cả thẻ đang chờ hỏi lại)."""
+        return self._due_left + self._relearn
+
+_flashcard_store = None
+
+def get_flashcard_store():
+    """Mở kho flashcard ở lần dùng đầu tiên (lần đầu còn kèm chuyển dữ liệu từ JSON cũ)."""
+    global _flashcard_store
+    with _data_lock:
+        if _flashcard_store is None:
+            _flashcard_store = FlashcardStore(FLASHCARD_DB_FILE)
+        return _flashcard_store
+
+# ====== FLASHCARD IMPORT / EXPORT (CSV, file text của Anki) ======
+# python uk_core.py import-cards vocab.csv        (cột 1: từ, cột 2: nghĩa; thiếu nghĩa thì tự dịch)
+# python uk_core.py export-cards deck.txt         (.csv -> CSV, còn lại -> định dạng text của Anki)
+ANKI_SEPARATORS = {"tab": "\t", "comma": ",", "semicolon": ";", "pipe": "|", "colon": ":", "space": " "}
+IMPORT_HEADER_WORDS = {"word", "words", "front", "term", "english", "từ", "từ vựng"}
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+def _clean_field(value, is_html):
+    if is_html:
+        value = html.unescape(_HTML_TAG_RE.sub(" ", value.replace("<br>", "; ")))
+    return " ".join(value.split())
+
+def read_flashcard_rows(path):
+    """Đọc lần lượt từng cặp (từ, nghĩa) trong file CSV / text xuất từ Anki; nghĩa có thể rỗng.
+
+    Hiểu các dòng "#separator:", "#html:", "#notetype column:"... mà Anki ghi ở đầu file.
+    """
+    delimiter = "," if path.lower().endswith(".csv") else "\t"
+    is_html = False
+    skip_columns = set()
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        line = f.readline()
+        while line.startswith("#"):
+            key, _, value = line[1:].strip().partition(":")
+            key, value = key.strip().lower(), value.strip()
+            if key == "separator":
+                delimiter = ANKI_SEPARATORS.get(value.lower(), value[:1] or delimiter)
+            elif key == "html":
+                is_html = value.lower() == "true"
+            elif key.endswith(" column") and value.isdigit():
+                skip_columns.add(int(value) - 1)   # cột loại note / deck / tags
+            line = f.readline()
+
+        first = True
+        for row in csv.reader(itertools.chain([line], f), delimiter=delimiter):
+            fields = [value for i, value in enumerate(row) if i not in skip_columns]
+            if not fields:
+                continue
+            word = _clean_field(fields[0], is_html)
+            meaning = _clean_field(fields[1], is_html) if len(fields) > 1 else ""
+            if first:
+                first = False
+                if word.lower() in IMPORT_HEADER_WORDS:
+                    continue
+            if word:
+                yield word, meaning
+
+@timed("flashcard.import")
+def import_flashcards(path, store=None, progress=None, cancel=None, batch_size=FLASHCARD_IO_BATCH):
+    """Nhập flashcard theo từng lô: bỏ từ trùng, dịch gộp các nghĩa còn thiếu, ghi mỗi lô một transaction.
+
+    progress(stats) được gọi sau mỗi lô; dừng sau lô hiện tại khi cancel (CancelToken) bị hủy.
+    Từ không dịch được thì bỏ qua (đếm vào "untranslated") để lần nhập sau thử lại.
+    """
+    store = store or get_flashcard_store()
+    seen = {normalize_word(word) for word in store.words()}
+    stats = {"rows": 0, "added": 0, "duplicates": 0, "translated": 0, "untranslated": 0}
+    batch = []
+
+    def flush():
+        missing = [i for i, (_, meaning) in enumerate(batch) if not meaning]
+        if missing:
+            translated = translate_batch([batch[i][0] for i in missing], cancel=cancel)
+            for i, vi in zip(missing, translated):
+                if vi and vi.strip().lower() != batch[i][0].lower():
+                    batch[i] = (batch[i][0], vi.strip())
+                    stats["translated"] += 1
+                else:
+                    stats["untranslated"] += 1
+        rows = [(word, meaning) for word, meaning in batch if meaning]
+        stats["added"] += store.add_many(rows)
+        index = get_word_index()
+        for word, _ in rows:
+            index.add(word, WORD_WEIGHT["flashcard"])
+        batch.clear()
+        if progress:
+            progress(dict(stats))
+
+    for word, meaning in read_flashcard_rows(path):
+        stats["rows"] += 1
+        key = normalize_word(word)
+        if key in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add(key)
+        batch.append((word, meaning))
+        if len(batch) >= batch_size:
+            flush()
+            if cancel is not None and cancel.cancelled:
+                return stats
+    if batch:
+        flush()
+    return stats
+
+@timed("flashcard.export")
+def export_flashcards(path, store=None):
+    """Ghi toàn bộ thẻ ra CSV (đuôi .csv) hoặc file text nhập được vào Anki; ghi qua file tạm. Trả về số thẻ."""
+    store = store or get_flashcard_store()
+    as_csv = path.lower().endswith(".csv")
+    count = 0
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        if as_csv:
+            writer = csv.writer(f)
+            writer.writerow(["word", "meaning"])
+        else:
+            f.write("#separator:tab\n#html:false\n")
+            writer = csv.writer(f, delimiter="\t", lineterminator="\n")
+        for word, meaning in store.iter_cards():
+            writer.writerow([word, meaning])
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+def import_cards_main(argv):
+    parser = argparse.ArgumentParser(prog="uk_core.py import-cards",
+                                     description="Nhập flashcard từ CSV hoặc file text xuất từ Anki.")
+    parser.add_argument("source", help="File .csv (từ,nghĩa) hoặc .txt của Anki (cột đầu là từ, cột hai là nghĩa)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    def progress(st):
+        print(f"\r{st['rows']} dòng, thêm {st['added']}", end="", file=sys.stderr)
+
+    stats = import_flashcards(args.source, progress=progress)
+    print(f"\rĐã đọc {stats['rows']} dòng: thêm {stats['added']}, trùng {stats['duplicates']}, "
+          f"tự dịch {stats['translated']}, không dịch được {stats['untranslated']} "
+          f"({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+    return 0
+
+def export_cards_main(argv):
+    parser = argparse.ArgumentParser(prog="uk_core.py export-cards",
+                                     description="Xuất flashcard ra CSV hoặc file text nhập được vào Anki.")
+    parser.add_argument("output", help="Đuôi .csv -> CSV, còn lại -> text phân cách bằng tab của Anki")
+    args = parser.parse_args(argv)
+
+    count = export_flashcards(args.output)
+    print(f"Đã xuất {count} flashcard ra {args.output}", file=sys.stderr)
+    return 0
+
+# ====== AUTOCOMPLETE (gợi ý theo tiền tố + sửa lỗi chính tả kiểu SymSpell) ======
+AUTOCOMPLETE_LIMIT = 8
+AUTOCOMPLETE_PREFIX_SCAN = 2000     # số từ tối đa xét khi tiền tố quá ngắn (vd. "a")
+FUZZY_MAX_DISTANCE = 2
+FUZZY_PREFIX_LENGTH = 6             # chỉ sinh biến thể xóa trên 6 ký tự đầu: chỉ mục nhỏ hơn nhiều, tra vẫn ~1-2 ms
+WORD_WEIGHT = {"offline": 1, "cache": 2, "flashcard": 3}   # nguồn quen thuộc hơn được xếp trước
+
+def delete_variants(word, max_distance=FUZZY_MAX_DISTANCE, prefix_length=FUZZY_PREFIX_LENGTH):
+    """Mọi chuỗi thu được khi xóa tối đa max_distance ký tự khỏi tiền tố của word (kể cả chính nó)."""
+    word = word[:prefix_length]
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+def edit_distance(a, b, max_distance):
+    """Khoảng cách Damerau-Levenshtein (có đổi chỗ 2 ký tự kề nhau); > max_distance thì trả về max_distance + 1."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        best = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, prev2[j - 2] + 1)
+            cur[j] = value
+            best = min(best, value)
+        if best > max_distance:
+            return max_distance + 1
+        prev2, prev = prev, cur
+    return min(prev[-1], max_distance + 1)
+
+class WordIndex:
+    """Từ vựng cục bộ cho ô tìm kiếm: từ đã tra, flashcard và từ điển offline.
+
+    Gợi ý theo tiền tố dùng mảng từ đã sắp xếp + bisect; gợi ý sửa lỗi dùng chỉ mục biến thể xóa
+    dựng sẵn (SymSpell) nên chỉ phải tính khoảng cách cho vài trăm ứng viên thay vì cả từ điển.
+    """
+
+    def __init__(self, max_distance=FUZZY_MAX_DISTANCE, prefix_length=FUZZY_PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.ready = False
+        self._lock = threading.Lock()
+        self._words = []        # từ đã chuẩn hóa, sắp xếp
+        self._weights = {}      # từ -> trọng số nguồn
+        self._variants = {}     # biến thể xóa -> [từ]
+        self._building = False
+
+    def __len__(self):
+        return len(self._weights)
+
+    def _add_to(self, weights, variants, key, weight):
+        old = weights.get(key)
+        if old is not None:
+            if weight > old:
+                weights[key] = weight
+            return False
+        weights[key] = weight
+        for variant in delete_variants(key, self.max_distance, self.prefix_length):
+            bucket = variants.get(variant)
+            if bucket is None:
+                variants[variant] = [key]
+            else:
+                bucket.append(key)
+        return True
+
+    def add(self, word, weight=WORD_WEIGHT["cache"]):
+        key = normalize_word(word)
+        if not key:
+            return
+        with self._lock:
+            if self._add_to(self._weights, self._variants, key, weight):
+                bisect.insort(self._words, key)
+
+    @timed("autocomplete.build")
+    def ensure_built(self):
+        """Nạp từ vựng từ mọi nguồn. Dựng ngoài khóa rồi mới hoán đổi để gợi ý vẫn chạy trong lúc dựng."""
+        with self._lock:
+            if self.ready or self._building:
+                return
+            self._building = True
+        weights, variants = {}, {}
+        for endpoint in OFFLINE_DICT_FILES:
+            offline = get_offline_dict(endpoint)
+            if offline is not None:
+                for key in offline.keys():
+                    self._add_to(weights, variants, key, WORD_WEIGHT["offline"])
+        for word in get_response_cache().words():
+            self._add_to(weights, variants, normalize_word(word), WORD_WEIGHT["cache"])
+        for word in get_flashcard_store().load_all():
+            self._add_to(weights, variants, normalize_word(word), WORD_WEIGHT["flashcard"])
+
+        with self._lock:
+            # Giữ lại các từ được add() trong lúc đang dựng
+            for key, weight in self._weights.items():
+                self._add_to(weights, variants, key, weight)
+            self._weights, self._variants = weights, variants
+            self._words = sorted(weights)
+            self.ready = True
+            self._building = False
+
+    def complete(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """Các từ bắt đầu bằng prefix: khớp đúng trước, rồi nguồn quen thuộc, rồi từ ngắn."""
+        key = normalize_word(prefix)
+        if not key:
+            return []
+        with self._lock:
+            start = bisect.bisect_left(self._words, key)
+            end = bisect.bisect_left(self._words, key + "\uffff", start,
+                                     min(len(self._words), start + AUTOCOMPLETE_PREFIX_SCAN))
+            matches = self._words[start:end]
+            weights = self._weights
+            return sorted(matches, key=lambda w: (w != key, -weights[w], len(w), w))[:limit]
+
+    def fuzzy(self, word, limit=AUTOCOMPLETE_LIMIT):
+        """Các từ cách word tối đa max_distance phép sửa, gần nhất trước."""
+        key = normalize_word(word)
+        if not key:
+            return []
+        with self._lock:
+            candidates = set()
+            for variant in delete_variants(key, self.max_distance, self.prefix_length):
+                bucket = self._variants.get(variant)
+                if bucket:
+                    candidates.update(bucket)
+            weights = self._weights
+            scored = []
+            for candidate in candidates:
+                distance = edit_distance(key, candidate, self.max_distance)
+                if distance <= self.max_distance:
+                    scored.append((distance, -weights[candidate], candidate))
+        scored.sort()
+        return [candidate for _, _, candidate in scored[:limit]]
+
+    @timed("autocomplete")
+    def suggest(self, text, limit=AUTOCOMPLETE_LIMIT):
+        """Gợi ý cho ô tìm kiếm: khớp tiền tố trước, thiếu thì bù bằng từ gần đúng."""
+        results = self.complete(text, limit)
+        if len(results) < limit and len(normalize_word(text)) >= 3:
+            seen = set(results)
+            results += [w for w in self.fuzzy(text, limit) if w not in seen][:limit - len(results)]
+        return results
+
+_word_index = None
+
+def get_word_index():
+    global _word_index
+    with _data_lock:
+        if _word_index is None:
+            _word_index = WordIndex()
+        return _word_index
+
+# ====== WARM-UP CACHE (chạy không cần giao diện) ======
+# python uk_core.py warm toeic_words.txt --concurrency 4 --rate 5
+WARMUP_PROGRESS_FILE = "warmup_progress.txt"
+WARMUP_CONCURRENCY = 4
+WARMUP_RATE = 5.0            # request / giây tới dictionaryapi.com
+WARMUP_REPORT_EVERY = 2.0    # giây giữa các dòng báo tiến độ
+
+class RateLimiter:
+    """Token bucket đơn giản: tối đa `rate` lần acquire() mỗi giây, dùng chung giữa các thread."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+def read_word_list(path):
+    """Đọc danh sách từ: mỗi dòng một từ, bỏ dòng trống, dòng '#' và từ trùng."""
+    seen = set()
+    words = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            word = line.strip()
+            if not word or word.startswith("#"):
+                continue
+            key = normalize_word(word)
+            if key not in seen:
+                seen.add(key)
+                words.append(word)
+    return words
+
+def load_warmup_progress(path):
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+def warm_up_word(word, limiter, url_templates, translate=True):
+    """Tải một từ vào cache phản hồi (và cache dịch nếu translate=True)."""
+    for url_template, key in url_templates:
+        if not get_response_cache().contains(endpoint_name(url_template), word):
+            limiter.acquire()
+        data = fetch_api(word, url_template, key)
+        if translate and endpoint_name(url_template) == "collegiate" and data and not isinstance(data[0], str):
+            defs = [d for entry_data in data for d in entry_data.get("shortdef", [])]
+            # Dịch lỗi thì translate_batch trả lại tiếng Anh (không cache): tính là lỗi để lần sau dịch lại
+            untranslated = sum(1 for text, vi in zip(defs, translate_batch(defs)) if vi == text)
+            if untranslated:
+                raise RuntimeError(f"chưa dịch được {untranslated}/{len(defs)} định nghĩa")
+
+def warm_up(words, url_templates=None, concurrency=WARMUP_CONCURRENCY, rate=WARMUP_RATE,
+            translate=True, progress_file=WARMUP_PROGRESS_FILE, report=print):
+    """Tải trước cả danh sách từ với số thread và tốc độ giới hạn.
+
+    Từ đã xong được ghi vào progress_file nên có thể chạy lại sau khi bị ngắt; từ lỗi sẽ được thử lại lần sau.
+    """
+    if url_templates is None:
+        url_templates = [(API_URL_DICT, DICTIONARY_KEY), (API_URL_THES, THESAURUS_KEY)]
+    done = load_warmup_progress(progress_file)
+    todo = [w for w in words if normalize_word(w) not in done]
+    total = len(todo)
+    report(f"Warm-up: {total} từ cần tải ({len(words) - total} đã xong từ lần trước).")
+
+    limiter = RateLimiter(rate)
+    lock = threading.Lock()
+    stats = {"done": 0, "failed": 0}
+    start = time.monotonic()
+    last_report = [start]
+    progress = open(progress_file, "a", encoding="utf-8") if progress_file else None
+
+    def print_progress(force=False):
+        now = time.monotonic()
+        if not force and now - last_report[0] < WARMUP_REPORT_EVERY:
+            return
+        last_report[0] = now
+        elapsed = max(now - start, 1e-9)
+        finished = stats["done"] + stats["failed"]
+        report(f"  {finished}/{total} ({stats['failed']} lỗi) - {finished / elapsed:.1f} từ/giây")
+
+    def job(word):
+        try:
+            warm_up_word(word, limiter, url_templates, translate)
+        except Exception as e:
+            with lock:
+                stats["failed"] += 1
+                report(f"  ⚠️ {word}: {e}")
+            return
+        with lock:
+            stats["done"] += 1
+            if progress:
+                progress.write(normalize_word(word) + "\n")
+                progress.flush()
+            print_progress()
+
+    # Semaphore giữ số job đang chờ ở mức concurrency * 2 thay vì nạp cả danh sách vào executor
+    slots = threading.BoundedSemaphore(concurrency * 2)
+
+    def run(word):
+        try:
+            job(word)
+        finally:
+            slots.release()
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for word in todo:
+                slots.acquire()
+                executor.submit(run, word)
+    finally:
+        if progress:
+            progress.close()
+
+    with lock:
+        print_progress(force=True)
+    elapsed = time.monotonic() - start
+    report(f"Hoàn tất trong {elapsed:.1f}s. Cache: {get_response_cache().stats()} | Dịch: {get_translation_cache().stats()}")
+    return stats
+
+def warm_up_main(argv):
+    parser = argparse.ArgumentParser(prog="uk_core.py warm", description="Tải trước danh sách từ vào cache.")
+    parser.add_argument("word_list", help="File danh sách từ, mỗi dòng một từ")
+    parser.add_argument("--concurrency", type=int, default=WARMUP_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=WARMUP_RATE, help="Số request tối đa mỗi giây (0 = không giới hạn)")
+    parser.add_argument("--no-translate", action="store_true", help="Chỉ tải dữ liệu từ điển, không dịch")
+    parser.add_argument("--no-thesaurus", action="store_true", help="Bỏ qua endpoint đồng/trái nghĩa")
+    parser.add_argument("--progress-file", default=WARMUP_PROGRESS_FILE)
+    parser.add_argument("--api-base", help="Thay https://www.dictionaryapi.com (vd. server giả lập khi test)")
+    args = parser.parse_args(argv)
+
+    if args.api_base:
+        set_api_base(args.api_base)
+    url_templates = [(API_URL_DICT, DICTIONARY_KEY)]
+    if not args.no_thesaurus:
+        url_templates.append((API_URL_THES, THESAURUS_KEY))
+
+    try:
+        warm_up(read_word_list(args.word_list), url_templates, args.concurrency, args.rate,
+                translate=not args.no_translate, progress_file=args.progress_file)
+    except KeyboardInterrupt:
+        print("Đã dừng. Chạy lại lệnh để tiếp tục từ chỗ cũ.")
+        return 130
+    return 0
+
+# ====== LOOKUP SERVER (HTTP/JSON, một cache dùng chung cho nhiều máy) ======
+# python uk_core.py serve --host 0.0.0.0 --port 8765
+# Máy khác: UK_DICT_SERVER=http://<ip>:8765 python uk_dict.py
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+SERVER_MAX_TRANSLATE_TEXTS = 500
+
+def upstream_for(endpoint):
+    """(url_template, key) của endpoint collegiate / thesaurus, None nếu không có."""
+    for url_template, key in ((API_URL_DICT, DICTIONARY_KEY), (API_URL_THES, THESAURUS_KEY)):
+        if endpoint_name(url_template) == endpoint:
+            return url_template, key
+    return None
+
+def server_stats():
+    return {
+        "api": api_client.stats(),
+        "response_cache": get_response_cache().stats(),
+        "translation_cache": get_translation_cache().stats(),
+        "stages": tracer.stage_stats(),
+        "worker_pool": worker_pool.stats(),
+        "offline": {endpoint: offline.stats() for endpoint, offline in _offline_dicts.items() if offline},
+    }
+
+class LookupRoutes:
+    """Xử lý request của server tra từ; ghép với BaseHTTPRequestHandler trong make_server()
+    (http.server chỉ được import khi chạy server, không làm chậm lúc mở giao diện). Các route:
+
+    GET  /api/v3/references/{collegiate|thesaurus}/json/<từ>  giống dictionaryapi.com (bỏ qua ?key=)
+    GET  /lookup/{meaning|syn_ant|phrasal}?word=<từ>          bản ghi như lookup_meaning()
+    POST /translate  {"texts": [...]} -> {"translations": [...]}
+    GET  /health                                              thống kê API / cache
+    """
+    server_version = "UkDictLookup/1.0"
+    protocol_version = "HTTP/1.1"   # giữ kết nối cho Session của client
+
+    def do_GET(self):
+        parsed = urllib.parse.urlsplit(self.path)
+        parts = [urllib.parse.unquote(p) for p in parsed.path.split("/") if p]
+        try:
+            if parts == ["health"]:
+                return self._send_json(200, server_stats())
+            if len(parts) == 6 and parts[:3] == ["api", "v3", "references"] and parts[4] == "json":
+                upstream = upstream_for(parts[3])
+                if upstream:
+                    return self._send_json(200, fetch_api(parts[5], *upstream))
+            if len(parts) == 2 and parts[0] == "lookup" and parts[1] in LOOKUP_KINDS:
+                word = urllib.parse.parse_qs(parsed.query).get("word", [""])[0].strip()
+                if not word:
+                    return self._send_error(400, "Thiếu tham số word")
+                return self._send_json(200, LOOKUP_KINDS[parts[1]](word))
+            self._send_error(404, "Không có route này")
+        except CircuitOpenError as e:
+            self._send_error(503, str(e))
+        except Exception as e:
+            self._send_error(502, str(e))
+
+    def do_POST(self):
+        # Luôn đọc hết body trước khi trả lời, kể cả khi lỗi: body còn sót sẽ làm hỏng request kế tiếp
+        # trên cùng kết nối keep-alive
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self.close_connection = True
+            return self._send_error(400, "Content-Length không hợp lệ")
+        body = self.rfile.read(length) if length > 0 else b""
+        if urllib.parse.urlsplit(self.path).path != "/translate":
+            return self._send_error(404, "Không có route này")
+        try:
+            texts = json.loads(body or b"{}")["texts"]
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                raise ValueError
+        except (ValueError, KeyError, TypeError):
+            return self._send_error(400, 'Body phải là {"texts": ["..."]}')
+        if len(texts) > SERVER_MAX_TRANSLATE_TEXTS:
+            return self._send_error(413, f"Tối đa {SERVER_MAX_TRANSLATE_TEXTS} đoạn mỗi request")
+        flight_key = ("translate", TRANSLATE_SOURCE, TRANSLATE_TARGET, tuple(texts))
+        translations = single_flight(flight_key, lambda: translate_batch(texts))
+        self._send_json(200, {"translations": translations})
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self._send_json(status, {"error": message})
+
+    def log_message(self, format, *args):
+        if getattr(self.server, "verbose", False):
+            super().log_message(format, *args)
+
+def make_server(host=SERVER_HOST, port=SERVER_PORT, verbose=False):
+    """Tạo server (chưa chạy). port=0 để hệ điều hành chọn cổng trống, tiện khi test."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    handler = type("LookupRequestHandler", (LookupRoutes, BaseHTTPRequestHandler), {})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    return server
+
+def serve_main(argv):
+    parser = argparse.ArgumentParser(prog="uk_core.py serve", description="Chạy server tra từ / dịch dùng chung một cache.")
+    parser.add_argument("--host", default=SERVER_HOST, help="0.0.0.0 để máy khác trong mạng LAN dùng được")
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--api-base", help="Thay https://www.dictionaryapi.com (vd. server giả lập khi test)")
+    parser.add_argument("--verbose", "-v", action="store_true", help="In log từng request")
+    args = parser.parse_args(argv)
+
+    if args.api_base:
+        set_api_base(args.api_base)
+    worker_pool.submit(get_response_cache().ensure_aliases, priority=PRIORITY_BACKGROUND)
+    server = make_server(args.host, args.port, args.verbose)
+    host, port = server.server_address[:2]
+    print(f"Server tra từ đang chạy tại http://{host}:{port} (Ctrl+C để dừng)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+# ====== BATCH CLI (JSON lines) ======
+# python uk_core.py batch words.txt --kind meaning syn_ant > out.jsonl
+BATCH_CONCURRENCY = 8
+
+def lookup_safe(word, kind):
+    """Như LOOKUP_KINDS[kind](word) nhưng trả về bản ghi lỗi thay vì ném exception."""
+    try:
+        return LOOKUP_KINDS[kind](word)
+    except Exception as e:
+        return {"word": word, "kind": kind, "status": "error", "error": str(e)}
+
+def batch_lookup(words, kinds=("meaning",), concurrency=BATCH_CONCURRENCY):
+    """Tra nhiều từ song song, trả về các bản ghi theo đúng thứ tự đầu vào."""
+    jobs = [(word, kind) for word in words for kind in kinds]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        yield from executor.map(lambda job: lookup_safe(*job), jobs)
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(prog="uk_core.py batch", description="Tra nhiều từ, in kết quả dạng JSON lines.")
+    parser.add_argument("word_list", help="File danh sách từ (mỗi dòng một từ), '-' để đọc từ stdin")
+    parser.add_argument("--kind", nargs="+", choices=sorted(LOOKUP_KINDS), default=["meaning"])
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--output", "-o", help="Ghi ra file thay vì stdout")
+    parser.add_argument("--api-base", help="Thay https://www.dictionaryapi.com (vd. server giả lập khi test)")
+    args = parser.parse_args(argv)
+
+    if args.api_base:
+        set_api_base(args.api_base)
+    if args.word_list == "-":
+        words = [line.strip() for line in sys.stdin if line.strip() and not line.startswith("#")]
+    else:
+        words = read_word_list(args.word_list)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for record in batch_lookup(words, args.kind, args.concurrency):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if args.output:
+            out.close()
+    return 0
+
+COMMANDS = {
+    "warm": warm_up_main,
+    "batch": batch_main,
+    "serve": serve_main,
+    "import-dict": import_dict_main,
+    "import-cards": import_cards_main,
+    "export-cards": export_cards_main,
+}
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print("Cách dùng: python uk_core.py {warm|batch|serve|import-dict|import-cards|export-cards} ... (thêm -h để xem chi tiết)")
+        return 2
+    return COMMANDS[argv[0]](argv[1:])
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,25 @@
-import requests
-import tkinter as tk
-from tkinter import ttk, messagebox
-from deep_translator import GoogleTranslator
-import urllib.parse
 import time
+_STARTUP_T0 = time.perf_counter()
+
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
 import threading
-import json
+import itertools
+import queue
+import sys
 import os
+from uk_core import (
+    endpoint_config, FLASHCARD_FILE,
+    fetch_api, translate_batch, fan_out, prefetch_related,
+    is_suggestion_list, parse_meaning, parse_syn_ant, parse_phrasal,
+    get_essay_store, get_essay_index, get_flashcard_store,
+    use_lookup_server, COMMANDS, main as core_main,
+    Trace, span, current_trace, tracer, api_client, get_response_cache, get_translation_cache,
+    get_word_index, normalize_word, WORD_WEIGHT, CancelToken,
+    worker_pool, PRIORITY_USER, PRIORITY_BACKGROUND,
+    ReviewSession, GRADE_AGAIN, GRADE_HARD, GRADE_GOOD, GRADE_EASY,
+    import_flashcards, export_flashcards, translate_essay, split_paragraphs,
+)
 
 # ====== GLOBAL FONT CONFIG ======
 BASE_FONT = "Segoe UI"  # hoặc "Helvetica" nếu dùng macOS
@@ -22,88 +35,56 @@ def scale(value, scale_factor):
     """Scale giá trị (kích thước, font size, padding, ...) theo hệ số"""
     return int(value * scale_factor)
 
-# ====== CONFIG ======
-DICTIONARY_KEY = "e1fd3412-7310-4f5f-a50d-9b0c257660e1"
-THESAURUS_KEY = "816b0b3b-c13c-4179-aa49-8c0c98aa26ff"
-
-API_URL_DICT = "https://www.dictionaryapi.com/api/v3/references/collegiate/json/{}?key={}"
-API_URL_THES = "https://www.dictionaryapi.com/api/v3/references/thesaurus/json/{}?key={}"
-
-translator = GoogleTranslator(source="en", target="vi")
-
 # Global placeholder for the temporary save button frame
 save_btn_placeholder_frame = None
 
-# ====== TRANSLATE UTILITIES ======
-def safe_translate(text):
-    """Dịch an toàn, tránh lỗi NoneType."""
-    try:
-        if not text or not isinstance(text, str):
-            return text
-        translated = translator.translate(text)
-        if not translated or translated.strip() == "":
-            return text
-        return translated
-    except Exception as e:
-        # print("⚠️ Lỗi dịch:", e) # Bỏ comment nếu muốn debug
-        return text
-
 # ====== COMMON FUNCTION ======
 def clear_result():
+    hide_suggestions()
+    typing_renderer.reset()
     result_text.delete(1.0, tk.END)
     clear_save_button() # Clear save button when starting a new search
 
-def fetch_api(word, url_template, key):
-    encoded_word = urllib.parse.quote(word)
-    url = url_template.format(encoded_word, key)
-    res = requests.get(url)
-    res.raise_for_status()
-    return res.json()
-
-# ====== ESSAY MANAGER & FLASHCARD MANAGER DATA ======
-ESSAY_FILE = "essays.json"
-essays = {} 
-
-def load_essays():
-    global essays
-    if not os.path.exists(ESSAY_FILE):
-        essays = {}
-        return {}
-    try:
-        with open(ESSAY_FILE, "r", encoding="utf-8") as f:
-            essays = json.load(f)
-            return essays
-    except json.JSONDecodeError:
-        essays = {}
-        return {}
-
-def save_essays(data):
-    with open(ESSAY_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-
-load_essays()
-
-FLASHCARD_FILE = "flashcards.json"
 flashcards = {}
+flashcards_loaded = threading.Event()
+_flashcards_lock = threading.Lock()
 
 def load_flashcards():
     global flashcards
-    if not os.path.exists(FLASHCARD_FILE):
-        flashcards = {}
-        return {}
+    with _flashcards_lock:
+        flashcards = get_flashcard_store().load_all()
+        flashcards_loaded.set()
+    return flashcards
+
+def ensure_flashcards_loaded():
+    """Flashcards được nạp ở thread nền sau khi cửa sổ hiện; hàm này chỉ nạp đồng bộ nếu nền chưa xong."""
+    if not flashcards_loaded.is_set():
+        with _flashcards_lock:
+            if flashcards_loaded.is_set():
+                return
+        load_flashcards()
+
+UI_BUSY_RETRY_MS = 500    # Hàng đợi việc nền đầy: việc nền của giao diện được xếp lại sau chừng này ms
+
+def submit_from_ui(fn, priority, on_busy):
+    """Xếp việc vào worker_pool từ luồng Tk mà không bao giờ chờ (chờ hàng đợi sẽ treo mainloop).
+
+    Hàng đợi đầy thì gọi on_busy() và trả về None.
+    """
     try:
-        with open(FLASHCARD_FILE, "r", encoding="utf-8") as f:
-            flashcards = json.load(f)
-            return flashcards
-    except json.JSONDecodeError:
-        flashcards = {}
-        return {}
-
-def save_flashcards_to_file(data):
-    with open(FLASHCARD_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-        
-load_flashcards()
+        return worker_pool.submit(fn, priority=priority, block=False)
+    except queue.Full:
+        on_busy()
+        return None
+
+def start_background_loading():
+    """Nạp flashcards, mở kho bài văn và dựng từ vựng gợi ý sau khung hình đầu tiên để cửa sổ chính hiện ngay."""
+    def loader():
+        ensure_flashcards_loaded()
+        get_essay_store()
+        get_response_cache().ensure_aliases()
+        get_word_index().ensure_built()
+    submit_from_ui(loader, PRIORITY_BACKGROUND, lambda: root.after(UI_BUSY_RETRY_MS, start_background_loading))
 
 def clear_save_button():
     global save_btn_placeholder_frame
@@ -114,6 +95,7 @@ def clear_save_button():
 
 def save_word_to_flashcards(word, definition_vi, btn_widget):
     global flashcards
+    ensure_flashcards_loaded()
     
     # Simple definition cleanup
     if definition_vi.startswith("→ "):
@@ -129,7 +111,8 @@ def save_word_to_flashcards(word, definition_vi, btn_widget):
         return
         
     flashcards[word] = definition_vi
-    save_flashcards_to_file(flashcards)
+    get_flashcard_store().add(word, definition_vi)
+    get_word_index().add(word, WORD_WEIGHT["flashcard"])
     
     # Update the button state to 'Saved' and disable the hover effect
     if btn_widget:
@@ -238,9 +221,177 @@ def open_save_editor(word, definition_vi_initial, btn_trigger):
     text_area.focus_set()
     text_area.tag_add("sel", "1.0", tk.END)
 
+# ====== LOOKUP PIPELINE (fetch + parse + dịch ngoài main thread) ======
+def render_segments(segments):
+    """Chèn một lô (text, tag) vào result_text (chạy trong main thread)."""
+    for text, tag in segments:
+        if tag:
+            result_text.insert(tk.END, text, tag)
+        else:
+            result_text.insert(tk.END, text)
+
+def post_if_current(token, fn):
+    """Chạy fn trong main thread, trừ khi lượt tra của token đã bị lượt mới thay thế."""
+    root.after(0, lambda: None if token is not None and token.cancelled else fn())
+
+def post_segments(segments, token=None):
+    """Gửi một lô hiển thị từ worker thread về main thread (thời gian chèn được tính vào stage render)."""
+    trace = current_trace()
+    def render():
+        with span("render", trace):
+            render_segments(segments)
+    post_if_current(token, render)
+
+def suggestion_segments(data):
+    return [("❌ Không tìm thấy. Gợi ý:\n", None)] + [(f" - {s}\n", None) for s in data]
+
+_current_lookup = None   # CancelToken của lượt tra đang hiển thị
+
+def new_lookup_token():
+    """Hủy lượt tra trước (request / dịch chưa chạy bị bỏ, callback hiển thị bị bỏ qua) và cấp token mới."""
+    global _current_lookup
+    if _current_lookup is not None:
+        _current_lookup.cancel()
+    _current_lookup = CancelToken()
+    return _current_lookup
+
+def run_lookup(word, endpoint, empty_message, handle_entries, kind="lookup"):
+    """Pipeline chung cho cả 3 kiểu tra cứu: gọi API và xử lý trong worker thread.
+
+    handle_entries(data, token) cũng chạy trong worker, chỉ được cập nhật UI qua post_if_current / post_segments.
+    Mỗi lượt tra có một Trace; trace kết thúc sau khi mọi phần hiển thị (kể cả hiệu ứng gõ chữ) xong.
+    """
+    token = new_lookup_token()
+    trace = Trace(kind, word=word)
+
+    def worker():
+        with trace.activate():
+            try:
+                if token.cancelled:
+                    return
+                url_template, key = endpoint_config(endpoint)
+                fan_out(word, url_template)
+                data = fetch_api(word, url_template, key)
+                if token.cancelled:
+                    # Kết quả vẫn đã vào cache, chỉ bỏ phần hiển thị / dịch / tải trước
+                    return
+                prefetch_related(word, data, url_template, key)
+                if not data:
+                    post_segments([(empty_message, None)], token)
+                    return
+                if is_suggestion_list(data):
+                    post_segments(suggestion_segments(data), token)
+                    return
+                get_word_index().add(word)
+                handle_entries(data, token)
+            except Exception as e:
+                post_segments([(f"⚠️ Lỗi: {e}\n", None)], token)
+            finally:
+                if token.cancelled:
+                    trace.attrs["cancelled"] = True
+                # Chạy sau các lô hiển thị đã gửi trước đó
+                root.after(0, trace.release)
+
+    def busy():
+        post_segments([("⏳ Đang bận, vui lòng thử lại sau giây lát.\n", None)], token)
+        trace.attrs["cancelled"] = True
+        trace.release()
+
+    submit_from_ui(worker, PRIORITY_USER, busy)
+
 # ====== FEATURE 1: TỪ ĐIỂN NGHĨA - Đã FIX lỗi UnboundLocalError ======
-TRANSLATE_DELAY = 0.25
-TYPING_DELAY_MS = 10
+TRANSLATING_PLACEHOLDER = "Đang dịch..."
+TYPING_ANIMATION = True        # False = hiện bản dịch ngay, không có hiệu ứng gõ chữ
+TYPING_FRAME_MS = 16           # ~60 khung hình / giây
+TYPING_CHARS_PER_FRAME = 6     # Mỗi khung hình gõ thêm ít nhất chừng này ký tự (làm tròn theo từ)
+
+_lookup_counter = itertools.count()
+
+class TypingRenderer:
+    """Thay placeholder bằng bản dịch theo mark của từng định nghĩa.
+
+    Mọi định nghĩa đang gõ dùng chung MỘT vòng root.after mỗi khung hình, mỗi lần chèn nguyên từ,
+    thay vì mỗi ký tự một callback và mỗi lần tìm placeholder trên toàn bộ Text.
+    """
+
+    def __init__(self, widget, tag="vi_style"):
+        self.widget = widget
+        self.tag = tag
+        self._jobs = []
+        self._marks = set()
+        self._after_id = None
+
+    def add_placeholder(self, mark, placeholder=TRANSLATING_PLACEHOLDER):
+        """Chèn placeholder vào cuối widget và đặt mark ngay trước nó."""
+        self.widget.mark_set(mark, tk.END + "-1c")
+        self.widget.mark_gravity(mark, "left")
+        self.widget.insert(tk.END, placeholder)
+        self._marks.add(mark)
+
+    def replace(self, mark, text, placeholder=TRANSLATING_PLACEHOLDER, trace=None):
+        """trace (nếu có) được giữ đến khi gõ xong, thời gian gõ tính vào stage typing."""
+        if mark not in self._marks:
+            return
+        self.widget.delete(mark, f"{mark} + {len(placeholder)} chars")
+        # Gravity "right": mark tự dời ra sau phần vừa chèn, lần chèn tiếp theo nối tiếp đúng chỗ
+        self.widget.mark_gravity(mark, "right")
+        if not TYPING_ANIMATION or not text:
+            with span("render", trace):
+                self._insert(mark, text)
+                self._finish(mark)
+            return
+        if trace is not None:
+            trace.hold()
+        self._jobs.append([mark, text, 0, trace, time.perf_counter()])
+        if self._after_id is None:
+            self._after_id = self.widget.after(TYPING_FRAME_MS, self._tick)
+
+    def _insert(self, mark, text):
+        if text:
+            self.widget.insert(mark, text, self.tag)
+
+    def _finish(self, mark):
+        self._marks.discard(mark)
+        self.widget.mark_unset(mark)
+
+    def _finish_job(self, job):
+        mark, _, _, trace, started = job
+        self._finish(mark)
+        if trace is not None:
+            tracer.record_span("typing", started, time.perf_counter() - started, trace)
+            trace.release()
+
+    def _tick(self):
+        self._after_id = None
+        remaining = []
+        for job in self._jobs:
+            mark, text, pos = job[:3]
+            end = pos + TYPING_CHARS_PER_FRAME
+            if end < len(text):
+                space = text.find(" ", end)
+                end = len(text) if space == -1 else space + 1
+            self._insert(mark, text[pos:end])
+            if end >= len(text):
+                self._finish_job(job)
+            else:
+                job[2] = end
+                remaining.append(job)
+        self._jobs = remaining
+        if self._jobs:
+            self._after_id = self.widget.after(TYPING_FRAME_MS, self._tick)
+
+    def reset(self):
+        """Hủy mọi hiệu ứng đang chạy (gọi khi xóa kết quả)."""
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        for mark in self._marks:
+            self.widget.mark_unset(mark)
+        for job in self._jobs:
+            if job[3] is not None:
+                job[3].release()
+        self._jobs = []
+        self._marks = set()
 
 def lookup_meaning():
     word = entry.get().strip()
@@ -251,129 +402,97 @@ def lookup_meaning():
     clear_result() # Gọi clear_save_button() ở đây
     result_text.insert(tk.END, f"🔎 Tra cứu nghĩa của: {word}\n\n")
 
-    def worker():
-        try:
-            data = fetch_api(word, API_URL_DICT, DICTIONARY_KEY)
-            if not data:
-                root.after(0, lambda: result_text.insert(tk.END, "❌ Không tìm thấy kết quả.\n"))
-                return
+    def handle_entries(data, token):
+        # 1. Gom tất cả định nghĩa cần dịch (chạy trong worker thread)
+        entries = parse_meaning(data)
+        definitions = [d for e in entries for d in e["definitions"]]
+        mark_prefix = f"vi{next(_lookup_counter)}_"
+        trace = current_trace()
+
+        # 2. Hiển thị kết quả tiếng Anh và placeholder (chạy trong main thread)
+        def show_english_and_placeholders():
+            with span("render", trace):
+                insert_english_and_placeholders()
+
+        def insert_english_and_placeholders():
+            i = 0
+            for e in entries:
+                if e["hw"]:
+                    result_text.insert(tk.END, f"{e['hw']} ({e['fl']})\n", "word_style")
+                for d in e["definitions"]:
+                    result_text.insert(tk.END, f"   • {d}\n")
+                    result_text.insert(tk.END, "     → ")
+                    typing_renderer.add_placeholder(f"{mark_prefix}{i}")
+                    result_text.insert(tk.END, "\n")
+                    i += 1
+                result_text.insert(tk.END, "\n")
 
-            if isinstance(data[0], str):
-                def show_suggestions():
-                    result_text.insert(tk.END, "❌ Không tìm thấy. Gợi ý:\n")
-                    for s in data:
-                        result_text.insert(tk.END, f" - {s}\n")
-                root.after(0, show_suggestions)
-                return
+        post_if_current(token, show_english_and_placeholders)
 
-            # 1. Lấy nghĩa tiếng Việt đầu tiên để lưu Flashcard (chạy trong worker thread)
-            first_definition_vi = None
-            if not isinstance(data[0], str):
-                first_entry = data[0]
-                if first_entry.get("shortdef"):
-                    first_definition_en = first_entry["shortdef"][0]
-                    first_definition_vi = safe_translate(first_definition_en)
+        # 3. Thêm nút Lưu Từ (chạy trong main thread)
+        def add_save_button_to_ui(word, definition):
+            global save_btn_placeholder_frame
+            if not definition: return 
             
-            # 2. Hiển thị kết quả tiếng Anh và placeholder (chạy trong main thread)
-            placeholder_items = []
-            def show_english_and_placeholders():
-                for entry_data in data:
-                    hw = entry_data.get("hwi", {}).get("hw", "")
-                    fl = entry_data.get("fl", "")
-                    defs = entry_data.get("shortdef", [])
-                    if hw:
-                        result_text.insert(tk.END, f"{hw} ({fl})\n", "word_style")
-                    for d in defs:
-                        result_text.insert(tk.END, f"   • {d}\n")
-                        placeholder = "Đang dịch..."
-                        result_text.insert(tk.END, f"     → {placeholder}\n")
-                        placeholder_items.append((placeholder, d))
-                    result_text.insert(tk.END, "\n")
-
-            root.after(0, show_english_and_placeholders)
+            ensure_flashcards_loaded()
+            is_saved = word in flashcards
+            
+            clear_save_button() # Đảm bảo nút cũ bị xóa
+            
+            save_btn_placeholder_frame = tk.Frame(root, bg="#fde4ec")
+            save_btn_placeholder_frame.pack(before=result_frame, pady=scale(10, scale_factor)) 
+            
+            save_text = "⭐ Lưu từ" if not is_saved else "⭐ Đã lưu"
+            save_bg = "#f8bbd0" if not is_saved else "#a5d6a7"
+            save_fg = "#880e4f" if not is_saved else "#1b5e20"
+            
+            # BƯỚC 1: Tạo nút trước
+            btn_save = tk.Button(
+                save_btn_placeholder_frame, 
+                text=save_text, 
+                command=lambda: None, # Tạm thời gán lệnh rỗng
+                font=(BASE_FONT, scale(11, scale_factor), "bold"),
+                bg=save_bg, 
+                fg=save_fg,
+                activebackground=save_bg, 
+                activeforeground=save_fg,
+                relief="flat", bd=0, 
+                padx=scale(15, scale_factor), 
+                pady=scale(6, scale_factor), 
+                cursor="hand2"
+            )
 
-            # 3. Thêm nút Lưu Từ (chạy trong main thread)
-            def add_save_button_to_ui(word, definition):
-                global save_btn_placeholder_frame
-                if not definition: return 
-                
-                is_saved = word in flashcards
+            # BƯỚC 2: Định nghĩa và gán lệnh thực tế
+            if not is_saved:
+                # Lệnh MỚI: Mở pop-up chỉnh sửa, truyền word, definition và chính btn_save này
+                cmd = lambda w=word, d=definition, b=btn_save: open_save_editor(w, d, b)
+                btn_save.config(command=cmd)
+                add_hover_effect(btn_save, save_bg, "#f48fb1")
+            else:
+                # Nếu đã lưu, command là thông báo, và loại bỏ hover
+                cmd = lambda w=word: messagebox.showinfo("Thông báo", f"Từ '{w}' đã được lưu trong Flashcards!")
+                btn_save.config(command=cmd)
+                btn_save.unbind("<Enter>")
+                btn_save.unbind("<Leave>")
                 
-                clear_save_button() # Đảm bảo nút cũ bị xóa
-                
-                save_btn_placeholder_frame = tk.Frame(root, bg="#fde4ec")
-                save_btn_placeholder_frame.pack(before=result_frame, pady=scale(10, scale_factor)) 
-                
-                save_text = "⭐ Lưu từ" if not is_saved else "⭐ Đã lưu"
-                save_bg = "#f8bbd0" if not is_saved else "#a5d6a7"
-                save_fg = "#880e4f" if not is_saved else "#1b5e20"
-                
-                # BƯỚC 1: Tạo nút trước
-                btn_save = tk.Button(
-                    save_btn_placeholder_frame, 
-                    text=save_text, 
-                    command=lambda: None, # Tạm thời gán lệnh rỗng
-                    font=(BASE_FONT, scale(11, scale_factor), "bold"),
-                    bg=save_bg, 
-                    fg=save_fg,
-                    activebackground=save_bg, 
-                    activeforeground=save_fg,
-                    relief="flat", bd=0, 
-                    padx=scale(15, scale_factor), 
-                    pady=scale(6, scale_factor), 
-                    cursor="hand2"
-                )
-
-                # BƯỚC 2: Định nghĩa và gán lệnh thực tế
-                if not is_saved:
-                    # Lệnh MỚI: Mở pop-up chỉnh sửa, truyền word, definition và chính btn_save này
-                    cmd = lambda w=word, d=definition, b=btn_save: open_save_editor(w, d, b)
-                    btn_save.config(command=cmd)
-                    add_hover_effect(btn_save, save_bg, "#f48fb1")
-                else:
-                    # Nếu đã lưu, command là thông báo, và loại bỏ hover
-                    cmd = lambda w=word: messagebox.showinfo("Thông báo", f"Từ '{w}' đã được lưu trong Flashcards!")
-                    btn_save.config(command=cmd)
-                    btn_save.unbind("<Enter>")
-                    btn_save.unbind("<Leave>")
-                    
-                # BƯỚC 3: Hiển thị nút
-                btn_save.pack()
-                
-            if first_definition_vi:
-                root.after(0, lambda: add_save_button_to_ui(word, first_definition_vi))
-
-            # 4. Hiệu ứng dịch và gõ chữ (chạy trong translate thread)
-            def translate_thread():
-                for placeholder, definition in placeholder_items:
-                    vi = safe_translate(definition)
-                    time.sleep(TRANSLATE_DELAY)
-
-                    def start_typing(placeholder=placeholder, vi=vi):
-                        idx = result_text.search(placeholder, "1.0", tk.END)
-                        if not idx:
-                            return
-                        result_text.delete(idx, f"{idx} + {len(placeholder)} chars")
-
-                        def type_char(pos_index, i=0):
-                            if i >= len(vi):
-                                return
-                            result_text.insert(pos_index, vi[i], "vi_style")
-                            next_pos = result_text.index(f"{pos_index} + 1 chars")
-                            root.after(TYPING_DELAY_MS, lambda: type_char(next_pos, i+1))
-
-                        type_char(idx, 0)
-
-                    root.after(0, start_typing)
+            # BƯỚC 3: Hiển thị nút
+            btn_save.pack()
+            
+        # 4. Dịch hàng loạt rồi hiệu ứng gõ chữ (vẫn trong worker thread, không cần thread riêng)
+        def translate_thread():
+            def on_translated(i, vi):
+                # Nghĩa đầu tiên dùng cho nút Lưu Flashcard
+                if i == 0 and vi:
+                    post_if_current(token, lambda: add_save_button_to_ui(word, vi))
+                post_if_current(token, lambda: typing_renderer.replace(f"{mark_prefix}{i}", vi, trace=trace))
 
-            threading.Thread(target=translate_thread, daemon=True).start()
+            translate_batch(definitions, on_result=on_translated, cancel=token)
 
-        except Exception as e:
-            root.after(0, lambda: result_text.insert(tk.END, f"⚠️ Lỗi: {e}\n"))
+        translate_thread()
 
-    threading.Thread(target=worker, daemon=True).start()
+    run_lookup(word, "collegiate", "❌ Không tìm thấy kết quả.\n", handle_entries, kind="meaning")
 
-# ====== FEATURE 2: ĐỒNG/TRÁI NGHĨA (Giữ nguyên) ======
+# ====== FEATURE 2: ĐỒNG/TRÁI NGHĨA ======
 def lookup_syn_ant():
     word = entry.get().strip()
     if not word or word == placeholder_text:
@@ -383,40 +502,24 @@ def lookup_syn_ant():
     clear_result()
     result_text.insert(tk.END, f"🟢 Tra cứu từ đồng nghĩa / trái nghĩa của: {word}\n\n")
 
-    try:
-        data = fetch_api(word, API_URL_THES, THESAURUS_KEY)
-        if not data:
-            result_text.insert(tk.END, "❌ Không tìm thấy dữ liệu.\n")
-            return
-
-        if isinstance(data[0], str):
-            result_text.insert(tk.END, "❌ Không tìm thấy. Gợi ý:\n")
-            for s in data:
-                result_text.insert(tk.END, f" - {s}\n")
-            return
-
-        for entry_data in data:
-            meta = entry_data.get("meta", {})
-            syns = meta.get("syns", [])
-            ants = meta.get("ants", [])
-            defs = entry_data.get("shortdef", [])
-            hw = entry_data.get("hwi", {}).get("hw", "")
-
-            if hw:
-                result_text.insert(tk.END, f"{hw}\n", "word_style")
-            if defs:
-                result_text.insert(tk.END, f"→ {defs[0]}\n\n")
-            if syns:
-                result_text.insert(tk.END, "🔹 Từ đồng nghĩa:\n", "syn_style")
-                result_text.insert(tk.END, ", ".join(syns[0]) + "\n\n")
-            if ants:
-                result_text.insert(tk.END, "🔸 Từ trái nghĩa:\n", "ant_style")
-                result_text.insert(tk.END, ", ".join(ants[0]) + "\n\n")
-
-    except Exception as e:
-        result_text.insert(tk.END, f"⚠️ Lỗi: {e}\n")
-
-# ====== FEATURE 3: PHRASAL VERB (Giữ nguyên) ======
+    def handle_entries(data, token):
+        segments = []
+        for e in parse_syn_ant(data):
+            if e["hw"]:
+                segments.append((f"{e['hw']}\n", "word_style"))
+            if e["definition"]:
+                segments.append((f"→ {e['definition']}\n\n", None))
+            if e["synonyms"]:
+                segments.append(("🔹 Từ đồng nghĩa:\n", "syn_style"))
+                segments.append((", ".join(e["synonyms"]) + "\n\n", None))
+            if e["antonyms"]:
+                segments.append(("🔸 Từ trái nghĩa:\n", "ant_style"))
+                segments.append((", ".join(e["antonyms"]) + "\n\n", None))
+        post_segments(segments, token)
+
+    run_lookup(word, "thesaurus", "❌ Không tìm thấy dữ liệu.\n", handle_entries, kind="syn_ant")
+
+# ====== FEATURE 3: PHRASAL VERB ======
 def lookup_phrasal():
     word = entry.get().strip()
     if not word or word == placeholder_text:
@@ -426,36 +529,26 @@ def lookup_phrasal():
     clear_result()
     result_text.insert(tk.END, f"📘 Tra cứu phrasal verb: {word}\n\n")
 
-    try:
-        data = fetch_api(word, API_URL_DICT, DICTIONARY_KEY)
-        if not data:
-            result_text.insert(tk.END, "❌ Không tìm thấy cụm này.\n")
+    def handle_entries(data, token):
+        phrasal_entries = parse_phrasal(data)
+        if not phrasal_entries:
+            post_segments([("Không tìm thấy phrasal verb.\n", None)], token)
             return
 
-        if isinstance(data[0], str):
-            result_text.insert(tk.END, "❌ Không tìm thấy. Gợi ý:\n")
-            for s in data:
-                result_text.insert(tk.END, f" - {s}\n")
+        # Dịch tất cả định nghĩa trong một lô
+        vis = iter(translate_batch([d for e in phrasal_entries for d in e["definitions"]], cancel=token))
+        if token.cancelled:
             return
+        segments = []
+        for e in phrasal_entries:
+            segments.append((f"{e['id']}\n", "word_style"))
+            for d in e["definitions"]:
+                segments.append((f"   • {d}\n", None))
+                segments.append((f"     → {next(vis)}\n", "vi_style"))
+            segments.append(("\n", None))
+        post_segments(segments, token)
 
-        found = False
-        for entry_data in data:
-            meta_id = entry_data.get("meta", {}).get("id", "")
-            if " " in meta_id:
-                found = True
-                defs = entry_data.get("shortdef", [])
-                result_text.insert(tk.END, f"{meta_id}\n", "word_style")
-                for d in defs:
-                    vi = safe_translate(d)
-                    result_text.insert(tk.END, f"   • {d}\n")
-                    result_text.insert(tk.END, f"     → {vi}\n", "vi_style")
-                result_text.insert(tk.END, "\n")
-
-        if not found:
-            result_text.insert(tk.END, "Không tìm thấy phrasal verb.\n")
-
-    except Exception as e:
-        result_text.insert(tk.END, f"⚠️ Lỗi: {e}\n")
+    run_lookup(word, "collegiate", "❌ Không tìm thấy cụm này.\n", handle_entries, kind="phrasal")
 
 # ====== UI UTILITIES (Hover, Animate) ======
 def hex_to_rgb(hex_color):
@@ -571,9 +664,11 @@ def close_with_animation(win):
 CARD_FRONT_COLOR = "#f48fb1"
 CARD_BACK_COLOR = "#880e4f"
 CARD_TEXT_COLOR = "white"
+FLASHCARD_ROW_HEIGHT = 150      # Chiều cao cố định mỗi hàng thẻ (trước khi scale) để tính vùng nhìn thấy
+FLASHCARD_OVERSCAN_ROWS = 2     # Số hàng đệm tạo sẵn phía trên / dưới vùng nhìn thấy
 
 def open_flashcard_manager():
-    load_flashcards() 
+    ensure_flashcards_loaded()
     
     manager_win = tk.Toplevel(root)
     manager_win.title("🃏 Hệ thống Flashcards")
@@ -592,30 +687,29 @@ def open_flashcard_manager():
         fg="#ad1457"
     ).pack(pady=scale(15, scale_factor))
 
-    # Scrollable Container
+    # Scrollable Container (ảo hóa: chỉ tạo widget cho các hàng đang thấy + vài hàng đệm)
     container = tk.Frame(manager_win, bg="#fde4ec")
     container.pack(fill="both", expand=True, padx=scale(20, scale_factor), pady=10)
 
     canvas = tk.Canvas(container, bg="#fde4ec", highlightthickness=0)
     scrollbar = ttk.Scrollbar(container, orient="vertical", command=canvas.yview)
-    scrollable_frame = tk.Frame(canvas, bg="#fde4ec")
 
-    scrollable_frame.bind(
-        "<Configure>",
-        lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-    )
-    canvas_window = canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
+    columns = 2
+    row_height = scale(FLASHCARD_ROW_HEIGHT, scale_factor)
+    card_pad = scale(10, scale_factor)
+    items = []          # [(en_word, vi_meaning), ...] theo thứ tự hiển thị
+    slots = []          # Pool widget thẻ được tái sử dụng khi cuộn
+    render_job = None
 
-    def resize_scroll_region(event):
-        canvas.itemconfig(canvas_window, width=event.width)
+    def on_yscroll(first, last):
+        scrollbar.set(first, last)
+        schedule_render()
 
-    canvas.bind("<Configure>", resize_scroll_region)
-    canvas.configure(yscrollcommand=scrollbar.set)
+    canvas.configure(yscrollcommand=on_yscroll)
+    canvas.bind("<Configure>", lambda e: schedule_render())
     canvas.pack(side="left", fill="both", expand=True)
     scrollbar.pack(side="right", fill="y")
-    
-    list_frame = scrollable_frame
-    
+
     # ====== CHỨC NĂNG CUỘN CHUỘT MỚI ======
     def _on_mousewheel(event):
         """Xử lý sự kiện cuộn chuột."""
@@ -629,7 +723,12 @@ def open_flashcard_manager():
     canvas.bind_all("<MouseWheel>", _on_mousewheel)
     canvas.bind_all("<Button-4>", _on_mousewheel)
     canvas.bind_all("<Button-5>", _on_mousewheel)
-    
+
+    def bind_scroll(widget):
+        widget.bind("<MouseWheel>", _on_mousewheel)
+        widget.bind("<Button-4>", _on_mousewheel)
+        widget.bind("<Button-5>", _on_mousewheel)
+
     # --- Card Flipping Logic ---
     def flip_card(card_label, english_word, vietnamese_meaning):
         """Lật thẻ giữa tiếng Anh và tiếng Việt"""
@@ -658,83 +757,137 @@ def open_flashcard_manager():
         if messagebox.askyesno("Xác nhận", f"Bạn có chắc muốn xóa từ '{word}' khỏi Flashcards?"):
             if word in flashcards:
                 del flashcards[word]
-                save_flashcards_to_file(flashcards)
-                callback()
+                get_flashcard_store().delete(word)
+                callback(word)
         
         # Đưa cửa sổ Flashcard lên trên cùng
         manager_win.lift()
 
-    # --- Refresh Card List (Đã thêm bind cuộn chuột cho các thẻ) ---
-    def refresh_cards():
-        # Xóa các widget cũ
-        for widget in list_frame.winfo_children():
-            widget.destroy()
-            
-        if not flashcards:
-            lbl_no_cards = tk.Label(
-                list_frame, 
-                text="Chưa có Flashcards nào được lưu. \nBạn hãy tra từ và nhấn '⭐ Lưu từ' để bắt đầu! 😥", 
-                bg="#fde4ec", 
-                fg="#ad1457",
-                font=(BASE_FONT, scale(14, scale_factor), "bold"),
-                pady=scale(50, scale_factor)
-            )
-            lbl_no_cards.pack(fill="x")
-            
-            # Gán sự kiện cuộn cho label này
-            lbl_no_cards.bind("<MouseWheel>", _on_mousewheel)
-            lbl_no_cards.bind("<Button-4>", _on_mousewheel)
-            lbl_no_cards.bind("<Button-5>", _on_mousewheel)
-            return
-            
-        # Layout: Grid 2 columns for better space usage
-        for i, (en_word, vi_meaning) in enumerate(flashcards.items()):
-            row = i // 2
-            col = i % 2
-            
-            # Flashcard container
-            card_frame = tk.Frame(list_frame, bg=CARD_FRONT_COLOR, bd=2, relief="raised")
-            card_frame.grid(row=row, column=col, padx=scale(10, scale_factor), pady=scale(10, scale_factor), sticky="nsew")
-            list_frame.grid_columnconfigure(col, weight=1)
-
-            # Label (the card itself) - Đã giảm kích thước như bạn yêu cầu
-            card_label = tk.Label(
-                card_frame,
+    def on_card_deleted(word):
+        # Chỉ bỏ một phần tử khỏi danh sách rồi vẽ lại các ô đang thấy, không dựng lại toàn bộ
+        for i, (en_word, _) in enumerate(items):
+            if en_word == word:
+                del items[i]
+                break
+        update_scroll_region()
+        render_visible()
+
+    # --- Pool thẻ (tạo một lần, tái sử dụng khi cuộn) ---
+    def create_slot():
+        card_frame = tk.Frame(canvas, bg=CARD_FRONT_COLOR, bd=2, relief="raised")
+        card_label = tk.Label(
+            card_frame,
+            font=(BASE_FONT, scale(16, scale_factor), "bold"),
+            bg=CARD_FRONT_COLOR,
+            fg=CARD_TEXT_COLOR,
+            wraplength=scale(180, scale_factor) # Giảm độ rộng tối đa của chữ
+        )
+        card_label.pack(fill="both", expand=True, padx=scale(10, scale_factor), pady=scale(10, scale_factor))
+
+        slot = {"frame": card_frame, "label": card_label, "word": None, "meaning": None}
+
+        # Bind click event
+        card_label.bind("<Button-1>", lambda e: flip_card(card_label, slot["word"], slot["meaning"]))
+
+        # --- Delete Button ---
+        delete_btn = tk.Button(
+            card_frame, 
+            text="Xóa", 
+            command=lambda: delete_flashcard(slot["word"], on_card_deleted),
+            font=(BASE_FONT, scale(8, scale_factor)), 
+            bg="#e57373", 
+            fg="white", 
+            relief="flat", 
+            bd=0,
+            cursor="hand2"
+        )
+        add_hover_effect(delete_btn, "#e57373", "#f06292")
+        delete_btn.pack(side="bottom", fill="x")
+
+        # ====== GÁN SỰ KIỆN CUỘN CHUỘT CHO CÁC WIDGET CON ======
+        for widget in (card_frame, card_label, delete_btn):
+            bind_scroll(widget)
+
+        slot["window"] = canvas.create_window(0, 0, window=card_frame, anchor="nw", state="hidden")
+        slots.append(slot)
+        return slot
+
+    def bind_slot(slot, en_word, vi_meaning):
+        if slot["word"] != en_word or slot["meaning"] != vi_meaning:
+            slot["word"] = en_word
+            slot["meaning"] = vi_meaning
+            slot["label"].config(
                 text=en_word,
-                font=(BASE_FONT, scale(16, scale_factor), "bold"),
                 bg=CARD_FRONT_COLOR,
-                fg=CARD_TEXT_COLOR,
-                height=scale(3, scale_factor),  # Giảm chiều cao
-                width=scale(18, scale_factor),  # Giảm chiều rộng
-                wraplength=scale(180, scale_factor) # Giảm độ rộng tối đa của chữ
+                font=(BASE_FONT, scale(16, scale_factor), "bold")
             )
-            card_label.pack(fill="both", expand=True, padx=scale(10, scale_factor), pady=scale(10, scale_factor))
-            
-            # Bind click event
-            card_label.bind("<Button-1>", lambda e, l=card_label, en=en_word, vi=vi_meaning: flip_card(l, en, vi))
-            
-            # --- Delete Button ---
-            delete_btn = tk.Button(
-                card_frame, 
-                text="Xóa", 
-                command=lambda w=en_word: delete_flashcard(w, refresh_cards),
-                font=(BASE_FONT, scale(8, scale_factor)), 
-                bg="#e57373", 
-                fg="white", 
-                relief="flat", 
-                bd=0,
-                cursor="hand2"
+
+    empty_label = tk.Label(
+        canvas, 
+        text="Chưa có Flashcards nào được lưu. \nBạn hãy tra từ và nhấn '⭐ Lưu từ' để bắt đầu! 😥", 
+        bg="#fde4ec", 
+        fg="#ad1457",
+        font=(BASE_FONT, scale(14, scale_factor), "bold"),
+        pady=scale(50, scale_factor)
+    )
+    bind_scroll(empty_label)
+    empty_window = canvas.create_window(0, 0, window=empty_label, anchor="nw", state="hidden")
+
+    def update_scroll_region():
+        rows = (len(items) + columns - 1) // columns
+        canvas.configure(scrollregion=(0, 0, canvas.winfo_width(), max(rows * row_height, 1)))
+
+    def schedule_render():
+        nonlocal render_job
+        if render_job is None:
+            render_job = canvas.after_idle(render_visible)
+
+    def render_visible():
+        """Gắn dữ liệu cho các ô trong vùng nhìn thấy (+ FLASHCARD_OVERSCAN_ROWS hàng đệm), ẩn các ô thừa."""
+        nonlocal render_job
+        render_job = None
+        if not canvas.winfo_exists():
+            return
+        width = canvas.winfo_width()
+        height = canvas.winfo_height()
+
+        if not items:
+            canvas.itemconfigure(empty_window, state="normal", width=width)
+            for slot in slots:
+                canvas.itemconfigure(slot["window"], state="hidden")
+            return
+        canvas.itemconfigure(empty_window, state="hidden")
+
+        top = canvas.canvasy(0)
+        total_rows = (len(items) + columns - 1) // columns
+        first_row = max(0, int(top // row_height) - FLASHCARD_OVERSCAN_ROWS)
+        last_row = min(total_rows, int((top + height) // row_height) + 1 + FLASHCARD_OVERSCAN_ROWS)
+        col_width = max(width // columns, 1)
+
+        needed = (last_row - first_row) * columns
+        while len(slots) < needed:
+            create_slot()
+
+        for k, slot in enumerate(slots):
+            index = first_row * columns + k
+            if k >= needed or index >= len(items):
+                canvas.itemconfigure(slot["window"], state="hidden")
+                continue
+            row, col = divmod(index, columns)
+            bind_slot(slot, *items[index])
+            canvas.coords(slot["window"], col * col_width + card_pad, row * row_height + card_pad)
+            canvas.itemconfigure(
+                slot["window"], state="normal",
+                width=max(col_width - 2 * card_pad, 1), height=max(row_height - 2 * card_pad, 1)
             )
-            add_hover_effect(delete_btn, "#e57373", "#f06292")
-            delete_btn.pack(side="bottom", fill="x")
-
-            # ====== GÁN SỰ KIỆN CUỘN CHUỘT CHO CÁC WIDGET CON ======
-            # Quan trọng: Gán sự kiện cho tất cả các widget con để scroll khi di chuột qua chúng
-            for widget in (card_frame, card_label, delete_btn):
-                widget.bind("<MouseWheel>", _on_mousewheel)
-                widget.bind("<Button-4>", _on_mousewheel)
-                widget.bind("<Button-5>", _on_mousewheel)
-            
+
+    # --- Refresh Card List ---
+    def refresh_cards():
+        items[:] = list(flashcards.items())
+        canvas.yview_moveto(0)
+        update_scroll_region()
+        render_visible()
+
     # --- Control Buttons ---
     control_frame = tk.Frame(manager_win, bg="#fde4ec")
     control_frame.pack(pady=scale(10, scale_factor))
@@ -753,12 +906,202 @@ def open_flashcard_manager():
     
     btn_refresh = create_small_pink_button(control_frame, "🔄 Tải lại", refresh_cards)
     btn_refresh.pack(side="left", padx=scale(10, scale_factor))
+
+    def submit_file_job(worker, finish):
+        """Chạy nhập / xuất ngoài luồng Tk; việc bị bỏ khỏi hàng đợi (đầy) cũng báo về finish."""
+        busy_message = "Hàng đợi đang bận, vui lòng thử lại."
+        future = submit_from_ui(worker, PRIORITY_BACKGROUND, lambda: finish(None, busy_message))
+        if future is not None:
+            future.add_done_callback(lambda f: f.cancelled() and root.after(0, finish, None, busy_message))
+
+    def export_cards():
+        path = filedialog.asksaveasfilename(
+            parent=manager_win, initialfile=FLASHCARD_FILE, defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("CSV", "*.csv"), ("Anki (text)", "*.txt")])
+        if not path:
+            return
+        btn_export.config(state="disabled")
+
+        def finish(count, error):
+            if not manager_win.winfo_exists():
+                return
+            btn_export.config(state="normal")
+            if error is not None:
+                messagebox.showerror("Lỗi", f"Không xuất được flashcards:\n{error}", parent=manager_win)
+                return
+            messagebox.showinfo("Thành công", f"Đã xuất {count} flashcards ra '{path}'.", parent=manager_win)
+            manager_win.lift()
+
+        def worker():
+            try:
+                store = get_flashcard_store()
+                count = store.export_json(path) if path.lower().endswith(".json") else export_flashcards(path, store)
+                root.after(0, finish, count, None)
+            except Exception as e:
+                root.after(0, finish, None, e)
+
+        submit_file_job(worker, finish)
+
+    btn_export = create_small_pink_button(control_frame, "📤 Xuất", export_cards)
+    btn_export.pack(side="left", padx=scale(10, scale_factor))
+
+    import_status = tk.Label(manager_win, font=(BASE_FONT, scale(10, scale_factor)), bg="#fde4ec", fg="#ad1457")
+
+    def import_cards():
+        path = filedialog.askopenfilename(
+            parent=manager_win, filetypes=[("CSV / Anki", "*.csv *.txt *.tsv"), ("Tất cả", "*.*")])
+        if not path:
+            return
+        btn_import.config(state="disabled")
+        import_status.config(text="Đang nhập...")
+        import_status.pack(before=control_frame)
+
+        fresh = {}
+
+        def show_progress(stats):
+            if manager_win.winfo_exists():
+                import_status.config(text=f"Đang nhập... {stats['rows']} dòng, đã thêm {stats['added']}")
+
+        def finish(stats, error):
+            if not manager_win.winfo_exists():
+                return
+            btn_import.config(state="normal")
+            import_status.pack_forget()
+            if error is not None:
+                messagebox.showerror("Lỗi", f"Không nhập được file:\n{error}", parent=manager_win)
+                return
+            flashcards.update(fresh)
+            refresh_cards()
+            messagebox.showinfo("Thành công",
+                                f"Đã thêm {stats['added']} flashcards ({stats['duplicates']} từ trùng bị bỏ qua, "
+                                f"tự dịch {stats['translated']}, không dịch được {stats['untranslated']}).",
+                                parent=manager_win)
+
+        def worker():
+            # Chạy ngoài luồng Tk: đọc, dịch và ghi theo lô; chỉ cập nhật giao diện qua root.after
+            try:
+                stats = import_flashcards(path, progress=lambda st: root.after(0, show_progress, st))
+                fresh.update(get_flashcard_store().load_all())
+                root.after(0, finish, stats, None)
+            except Exception as e:
+                root.after(0, finish, None, e)
+
+        ensure_flashcards_loaded()
+        submit_file_job(worker, finish)
+
+    btn_import = create_small_pink_button(control_frame, "📥 Nhập CSV/Anki", import_cards)
+    btn_import.pack(side="left", padx=scale(10, scale_factor))
+
+    btn_review = create_small_pink_button(control_frame, "🧠 Ôn tập", lambda: open_review_window(manager_win))
+    btn_review.pack(side="left", padx=scale(10, scale_factor))
     
     refresh_cards()
+
+# ====== SPACED REPETITION REVIEW ======
+REVIEW_GRADES = (   # (nhãn, điểm SM-2, phím tắt)
+    ("😵 Quên", GRADE_AGAIN, "1"),
+    ("😓 Khó", GRADE_HARD, "2"),
+    ("🙂 Nhớ", GRADE_GOOD, "3"),
+    ("😎 Dễ", GRADE_EASY, "4"),
+)
+
+def open_review_window(parent=None):
+    """Ôn các thẻ đến hạn: mỗi thẻ lấy từ heap của ReviewSession, kết quả ghi ngay xuống DB."""
+    session = ReviewSession(get_flashcard_store())
+    state = {"card": None, "revealed": False}
+
+    win = tk.Toplevel(parent or root)
+    win.title("🧠 Ôn tập flashcard")
+    win.geometry(f"{scale(520, scale_factor)}x{scale(380, scale_factor)}")
+    win.configure(bg="#fde4ec")
+    win.protocol("WM_DELETE_WINDOW", lambda: close_with_animation(win))
+
+    status = tk.Label(win, font=(BASE_FONT, scale(10, scale_factor)), bg="#fde4ec", fg="#ad1457")
+    status.pack(fill="x", pady=(scale(10, scale_factor), 0))
+
+    word_label = tk.Label(win, font=(BASE_FONT, scale(22, scale_factor), "bold"), bg="#fde4ec", fg="#880e4f",
+                          wraplength=scale(460, scale_factor))
+    word_label.pack(pady=(scale(25, scale_factor), scale(10, scale_factor)))
+
+    meaning_label = tk.Label(win, font=(BASE_FONT, scale(13, scale_factor)), bg="#fde4ec", fg="#4a148c",
+                             wraplength=scale(460, scale_factor), justify="center")
+    meaning_label.pack(fill="both", expand=True, padx=scale(20, scale_factor))
+
+    button_frame = tk.Frame(win, bg="#fde4ec")
+    button_frame.pack(pady=scale(15, scale_factor))
+
+    def make_button(text, command):
+        btn = tk.Button(button_frame, text=text, command=command,
+                        font=(BASE_FONT, scale(11, scale_factor), "bold"), bg="#f8bbd0", fg="#880e4f",
+                        activebackground="#f48fb1", activeforeground="white",
+                        relief="flat", padx=scale(12, scale_factor), pady=scale(6, scale_factor), cursor="hand2")
+        add_hover_effect(btn, "#f8bbd0", "#f48fb1")
+        return btn
+
+    reveal_btn = make_button("👀 Hiện nghĩa (Space)", lambda: reveal())
+    grade_btns = [make_button(f"{label} ({key})", lambda q=quality: grade(q)) for label, quality, key in REVIEW_GRADES]
+
+    def update_status():
+        status.config(text=f"Đã ôn: {session.reviewed}  •  Sai: {session.lapses}  •  Còn lại: {session.remaining()}")
+
+    def show_buttons(revealed):
+        for btn in [reveal_btn] + grade_btns:
+            btn.pack_forget()
+        if state["card"] is None:
+            return
+        if revealed:
+            for btn in grade_btns:
+                btn.pack(side="left", padx=scale(5, scale_factor))
+        else:
+            reveal_btn.pack()
+
+    def show_next():
+        if not win.winfo_exists():
+            return
+        card = session.next_card()
+        state["card"], state["revealed"] = card, False
+        update_status()
+        if card is None:
+            pending = session.relearn_pending()
+            word_label.config(text="🎉 Hết thẻ đến hạn!")
+            meaning_label.config(text="Các thẻ trả lời sai sẽ được hỏi lại sau ít phút." if pending else "")
+            if pending:
+                # Chờ thẻ sai tới giờ hỏi lại rồi tiếp tục phiên
+                win.after(5000, lambda: state["card"] is None and show_next())
+        else:
+            word_label.config(text=card.word)
+            meaning_label.config(text="")
+        show_buttons(False)
+
+    def reveal():
+        if state["card"] is None or state["revealed"]:
+            return
+        state["revealed"] = True
+        meaning_label.config(text=state["card"].meaning)
+        show_buttons(True)
+
+    def grade(quality):
+        if state["card"] is None or not state["revealed"]:
+            return
+        session.answer(state["card"], quality)
+        show_next()
+
+    win.bind("<space>", lambda e: reveal())
+    for _, quality, key in REVIEW_GRADES:
+        win.bind(key, lambda e, q=quality: grade(q))
+
+    show_next()
+    win.focus_set()
     
 # ====== ESSAY MANAGER (Đã giữ nguyên logic) ======
+ESSAY_SEARCH_LIMIT = 50     # Số kết quả tối đa hiển thị khi đang tìm
+ESSAY_LIST_PAGE = 100       # Số bài vẽ mỗi lần khi không tìm (nút "Hiện thêm" để xem tiếp)
+ESSAY_SEARCH_DEBOUNCE_MS = 150   # chờ người dùng ngừng gõ chừng này rồi mới lọc danh sách
 
 def open_essay_window():
+    essay_store = get_essay_store()
+    essay_index = get_essay_index()
+
     essay_win = tk.Toplevel(root)
     essay_win.title("📚 Bài văn mẫu")
     # Đã giảm kích thước cơ sở
@@ -796,6 +1139,41 @@ def open_essay_window():
     back_main_btn.pack(pady=scale(5, scale_factor))
     add_hover_effect(back_main_btn, "#f8bbd0", "#f48fb1")
 
+    # ====== Ô tìm kiếm (lọc theo tiêu đề + nội dung, không cần gõ dấu) ======
+    search_var = tk.StringVar()
+    search_entry = tk.Entry(essay_win, textvariable=search_var, width=40, font=(BASE_FONT, scale(12, scale_factor)),
+                            relief="flat", bg="#fff0f6", fg="#880e4f",
+                            highlightthickness=2, highlightbackground="#f8bbd0", highlightcolor="#f48fb1")
+    search_entry.pack(pady=scale(5, scale_factor), ipady=scale(4, scale_factor))
+    search_job = None
+
+    def schedule_refresh(*args):
+        """Lọc lại sau ESSAY_SEARCH_DEBOUNCE_MS; phím gõ sau thay thế lần lọc trước chưa chạy."""
+        nonlocal search_job
+        if search_job is not None:
+            essay_win.after_cancel(search_job)
+        search_job = essay_win.after(ESSAY_SEARCH_DEBOUNCE_MS, run_scheduled_refresh)
+
+    def run_scheduled_refresh():
+        nonlocal search_job
+        search_job = None
+        if essay_win.winfo_exists():
+            refresh_list()
+
+    search_var.trace_add("write", schedule_refresh)
+
+    def build_index():
+        essay_index.ensure_built()
+        # Dựng xong thì lọc lại theo nội dung nếu người dùng đã gõ sẵn từ khóa
+        if search_var.get().strip():
+            essay_win.after(0, lambda: essay_win.winfo_exists() and refresh_list())
+
+    def submit_build_index():
+        submit_from_ui(build_index, PRIORITY_BACKGROUND, lambda: essay_win.after(
+            UI_BUSY_RETRY_MS, lambda: essay_win.winfo_exists() and submit_build_index()))
+
+    submit_build_index()
+
     # ====== Frame chứa danh sách bài có thanh cuộn ======
     container = tk.Frame(essay_win, bg="#fde4ec")
     container.pack(fill="both", expand=True, padx=scale(20, scale_factor), pady=10)
@@ -858,46 +1236,78 @@ def open_essay_window():
     list_frame = scrollable_frame
 
 
-    def refresh_list():
-        for widget in list_frame.winfo_children():
-            widget.destroy()
-
-        for name in essays.keys():
-            # ====== Thẻ chứa từng bài ======
-            frame_item = tk.Frame(
-                list_frame,
-                bg="#fff0f6",
-                bd=0,
-                relief="flat",
-                highlightbackground="#f8bbd0",
-                highlightthickness=2
-            )
-            frame_item.pack(
-                fill="x",
-                padx=scale(40, scale_factor),
-                pady=scale(6, scale_factor),
-                expand=True
-            )
+    # Hàng được tạo một lần rồi tái sử dụng: lọc lại chỉ đổi chữ trên nút, không dựng lại widget
+    rows = []
+    list_state = {"query": None, "limit": ESSAY_LIST_PAGE}
 
-            # ====== Nút mở bài ======
-            btn = tk.Button(
-                frame_item,
-                text=name,
-                font=(BASE_FONT, scale(12, scale_factor), "bold"),
-                bg="#f8bbd0",
-                fg="#880e4f",
-                relief="flat",
-                bd=0,
-                cursor="hand2",
-                activebackground="#f48fb1",
-                activeforeground="white",
-                padx=scale(15, scale_factor),
-                pady=scale(8, scale_factor),
-                command=lambda n=name: open_essay_detail(n)
-            )
-            btn.pack(fill="x", expand=True, ipadx=scale(5, scale_factor), ipady=scale(8, scale_factor))
+    def create_row():
+        # ====== Thẻ chứa từng bài ======
+        frame_item = tk.Frame(
+            list_frame,
+            bg="#fff0f6",
+            bd=0,
+            relief="flat",
+            highlightbackground="#f8bbd0",
+            highlightthickness=2
+        )
+        row = {"frame": frame_item, "name": None}
+
+        # ====== Nút mở bài ======
+        btn = tk.Button(
+            frame_item,
+            font=(BASE_FONT, scale(12, scale_factor), "bold"),
+            bg="#f8bbd0",
+            fg="#880e4f",
+            relief="flat",
+            bd=0,
+            cursor="hand2",
+            activebackground="#f48fb1",
+            activeforeground="white",
+            padx=scale(15, scale_factor),
+            pady=scale(8, scale_factor),
+            command=lambda: open_essay_detail(row["name"])
+        )
+        btn.pack(fill="x", expand=True, ipadx=scale(5, scale_factor), ipady=scale(8, scale_factor))
+        add_hover_effect(btn, "#f8bbd0", "#f48fb1")
+        row["button"] = btn
+        rows.append(row)
+        return row
 
-            add_hover_effect(btn, "#f8bbd0", "#f48fb1")
+    def show_more():
+        list_state["limit"] += ESSAY_LIST_PAGE
+        refresh_list()
+
+    more_btn = tk.Button(list_frame, command=show_more, font=(BASE_FONT, scale(11, scale_factor)),
+                         bg="#fde4ec", fg="#ad1457", relief="flat", bd=0, cursor="hand2",
+                         activebackground="#f8bbd0", activeforeground="#880e4f")
+
+    def refresh_list():
+        query = search_var.get()
+        if query != list_state["query"]:
+            list_state["query"] = query
+            list_state["limit"] = ESSAY_LIST_PAGE
+            canvas.yview_moveto(0)
+        names = essay_index.search(query)
+        # Chỉ vẽ các kết quả đứng đầu khi đang tìm, còn không thì từng trang ESSAY_LIST_PAGE bài
+        limit = ESSAY_SEARCH_LIMIT if query.strip() else list_state["limit"]
+        hidden = max(len(names) - limit, 0)
+        names = names[:limit]
+
+        more_btn.pack_forget()
+        while len(rows) < len(names):
+            create_row()
+        for row, name in zip(rows, names):
+            if row["name"] != name:
+                row["name"] = name
+                row["button"].config(text=name)
+            if not row["frame"].winfo_manager():
+                row["frame"].pack(fill="x", padx=scale(40, scale_factor), pady=scale(6, scale_factor), expand=True)
+        for row in rows[len(names):]:
+            row["name"] = None
+            row["frame"].pack_forget()
+        if hidden and not query.strip():
+            more_btn.config(text=f"⬇ Hiện thêm ({hidden} bài nữa)")
+            more_btn.pack(pady=scale(6, scale_factor))
 
     def open_essay_detail(name):
         detail_win = tk.Toplevel(essay_win)
@@ -905,7 +1315,14 @@ def open_essay_window():
         detail_win.geometry(f"{scale(650, scale_factor)}x{scale(550, scale_factor)}")
         detail_win.configure(bg="#fde4ec")
 
-        detail_win.protocol("WM_DELETE_WINDOW", lambda: close_with_animation(detail_win))
+        translate_state = {"token": None, "shown": False}
+
+        def close_detail():
+            if translate_state["token"] is not None:
+                translate_state["token"].cancel()
+            close_with_animation(detail_win)
+
+        detail_win.protocol("WM_DELETE_WINDOW", close_detail)
 
         animate_zoom_fade_in(detail_win)
 
@@ -913,8 +1330,9 @@ def open_essay_window():
                             bg="#fde4ec", fg="#ad1457")
         lbl_title.pack(pady=scale(10, scale_factor))
 
+        text_frame = tk.Frame(detail_win, bg="#fde4ec")
         txt = tk.Text(
-            detail_win,
+            text_frame,
             wrap="word",
             font=(BASE_FONT, scale(12, scale_factor)),
             bg="#fff0f6",
@@ -930,41 +1348,107 @@ def open_essay_window():
         btn_frame = tk.Frame(detail_win, bg="#fde4ec")
         btn_frame.pack(pady=scale(10, scale_factor))
         
-        txt.pack(fill="both", expand=True, padx=scale(20, scale_factor), pady=scale(10, scale_factor))
-        txt.insert(tk.END, essays[name])
+        text_frame.pack(fill="both", expand=True, padx=scale(20, scale_factor), pady=scale(10, scale_factor))
+        txt.pack(side="left", fill="both", expand=True)
+        body = essay_store.get(name) or ""
+        txt.insert(tk.END, body)
         txt.config(state="disabled")
 
+        # ====== Bản dịch song song (mỗi đoạn một tag, đoạn nào dịch xong thì thay vào chỗ) ======
+        trans_txt = tk.Text(
+            text_frame,
+            wrap="word",
+            font=(BASE_FONT, scale(12, scale_factor)),
+            bg="#fff0f6",
+            fg="#4a148c",
+            padx=scale(10, scale_factor),
+            pady=scale(10, scale_factor),
+            relief="flat",
+            height=25,
+            highlightthickness=2,
+            highlightbackground="#f8bbd0"
+        )
+        trans_txt.tag_config("pending", foreground="#b0788f")
+
+        def show_paragraph(token, i, vi):
+            if token.cancelled or not detail_win.winfo_exists():
+                return
+            ranges = trans_txt.tag_ranges(f"p{i}")
+            if not ranges:
+                return
+            trans_txt.config(state="normal")
+            trans_txt.delete(ranges[0], ranges[1])
+            trans_txt.insert(ranges[0], vi, (f"p{i}",))
+            trans_txt.config(state="disabled")
+
+        def start_translation():
+            """Dịch (lại) nội dung đang lưu; đoạn không đổi lấy ngay từ cache, chỉ đoạn đã sửa phải gửi đi dịch."""
+            if translate_state["token"] is not None:
+                translate_state["token"].cancel()
+            token = translate_state["token"] = CancelToken()
+            trans_txt.config(state="normal")
+            trans_txt.delete("1.0", tk.END)
+            for i, paragraph in enumerate(split_paragraphs(body)):
+                trans_txt.insert(tk.END, paragraph, (f"p{i}", "pending"))
+                trans_txt.insert(tk.END, "\n\n")
+            trans_txt.config(state="disabled")
+            # Các khúc chưa có trong cache được xếp vào worker_pool ở mức nền, hàm trả về ngay
+            translate_essay(body, on_paragraph=lambda i, vi: root.after(0, show_paragraph, token, i, vi),
+                            cancel=token, wait=False)
+
+        def toggle_translation():
+            if translate_state["shown"]:
+                if translate_state["token"] is not None:
+                    translate_state["token"].cancel()
+                trans_txt.pack_forget()
+                translate_btn.config(text="🌐 Bản dịch")
+                translate_state["shown"] = False
+                return
+            translate_state["shown"] = True
+            translate_btn.config(text="🙈 Ẩn bản dịch")
+            if detail_win.winfo_width() < scale(1000, scale_factor):
+                detail_win.geometry(f"{scale(1100, scale_factor)}x{max(detail_win.winfo_height(), scale(550, scale_factor))}")
+            trans_txt.pack(side="left", fill="both", expand=True, padx=(scale(10, scale_factor), 0))
+            start_translation()
+
         def enable_edit():
             txt.config(state="normal")
             edit_btn.pack_forget()
             delete_btn.pack_forget()
+            translate_btn.pack_forget()
             save_btn.pack(side="left", padx=scale(8, scale_factor))
             cancel_btn.pack(side="left", padx=scale(8, scale_factor))
 
         def save_changes():
-            essays[name] = txt.get("1.0", tk.END).strip()
-            save_essays(essays)
+            nonlocal body
+            body = txt.get("1.0", tk.END).strip()
+            essay_store.save(name, body)
+            essay_index.update(name, body)
             txt.config(state="disabled")
             save_btn.pack_forget()
             cancel_btn.pack_forget()
             edit_btn.pack(side="left", padx=scale(8, scale_factor))
             delete_btn.pack(side="left", padx=scale(8, scale_factor))
+            translate_btn.pack(side="left", padx=scale(8, scale_factor))
+            if translate_state["shown"]:
+                start_translation()
             messagebox.showinfo("✅ Đã lưu", f"Đã cập nhật bài: {name}")
 
         def cancel_edit():
             txt.delete("1.0", tk.END)
-            txt.insert(tk.END, essays[name])
+            txt.insert(tk.END, body)
             txt.config(state="disabled")    
             save_btn.pack_forget()
             cancel_btn.pack_forget()
             edit_btn.pack(side="left", padx=scale(8, scale_factor))
             delete_btn.pack(side="left", padx=scale(8, scale_factor))
+            translate_btn.pack(side="left", padx=scale(8, scale_factor))
 
         def delete_essay():
             if messagebox.askyesno("Xác nhận", f"Bạn có chắc muốn xóa bài '{name}' không?"):
-                del essays[name]
-                save_essays(essays)
-                close_with_animation(detail_win)
+                essay_store.delete(name)
+                essay_index.remove(name)
+                close_detail()
                 messagebox.showinfo("🗑 Đã xóa", f"Đã xóa bài '{name}'.")
                 refresh_list()
 
@@ -984,6 +1468,14 @@ def open_essay_window():
         add_hover_effect(delete_btn, "#f8bbd0", "#f48fb1")
         delete_btn.pack(side="left", padx=scale(8, scale_factor))
 
+        translate_btn = tk.Button(btn_frame, text="🌐 Bản dịch", command=toggle_translation,
+                            font=(BASE_FONT, scale(11, scale_factor), "bold"),
+                            bg="#f8bbd0", fg="#880e4f",
+                            activebackground="#f48fb1", activeforeground="white",
+                            relief="flat", padx=scale(15, scale_factor), pady=scale(6, scale_factor), cursor="hand2")
+        add_hover_effect(translate_btn, "#f8bbd0", "#f48fb1")
+        translate_btn.pack(side="left", padx=scale(8, scale_factor))
+
         save_btn = tk.Button(btn_frame, text="💾 Lưu bài", command=save_changes,
                             font=(BASE_FONT, scale(11, scale_factor), "bold"),
                             bg="#f8bbd0", fg="#880e4f",
@@ -998,7 +1490,7 @@ def open_essay_window():
                             relief="flat", padx=scale(15, scale_factor), pady=scale(6, scale_factor), cursor="hand2")
         add_hover_effect(cancel_btn, "#f8bbd0", "#f48fb1")
 
-        back_btn = tk.Button(detail_win, text="🔙 Quay lại danh sách", command=lambda: close_with_animation(detail_win),
+        back_btn = tk.Button(detail_win, text="🔙 Quay lại danh sách", command=close_detail,
                             font=(BASE_FONT, scale(11, scale_factor), "bold"),
                             bg="#f8bbd0", fg="#880e4f",
                             activebackground="#f48fb1", activeforeground="white",
@@ -1037,8 +1529,8 @@ def open_essay_window():
             if not title or not content:
                 messagebox.showwarning("Cảnh báo", "Vui lòng nhập đủ tiêu đề và nội dung.")
                 return
-            essays[title] = content
-            save_essays(essays)
+            essay_store.save(title, content)
+            essay_index.update(title, content)
             messagebox.showinfo("Thành công", f"Đã thêm bài: {title}")
             close_with_animation(popup)
             refresh_list()
@@ -1081,6 +1573,113 @@ def open_essay_window():
     refresh_list()
 
 
+# ====== DIAGNOSTICS (F12: thời gian từng giai đoạn, tỉ lệ trúng cache) ======
+DIAGNOSTICS_REFRESH_MS = 1000
+STAGE_ORDER = ("offline_lookup", "cache_lookup", "http", "json_decode", "parse", "translate", "translate_request", "render", "typing")
+
+def format_breakdown(breakdown):
+    """{stage: giây} -> "http 120 · parse 2 · ..." (ms), theo thứ tự pipeline."""
+    stages = [s for s in STAGE_ORDER if s in breakdown] + sorted(s for s in breakdown if s not in STAGE_ORDER)
+    return " · ".join(f"{s} {breakdown[s] * 1000:.0f}" for s in stages)
+
+def cache_summary():
+    rc = get_response_cache().stats()
+    tc = get_translation_cache().stats()
+    api = api_client.stats()
+    pool = worker_pool.stats()
+    circuit = " · ⚠️ đang ngắt mạch" if api["circuit_open"] else ""
+    user_wait = pool["wait_ms"].get("user", {}).get("p95", 0.0)
+    return (f"Cache API: {rc['hit_rate']:.0%} trúng ({rc['hits']}/{rc['hits'] + rc['misses']}, "
+            f"{rc['alias_hits']} qua dạng biến đổi) · "
+            f"Bộ nhớ dịch: {tc['hit_rate']:.0%} trúng · "
+            f"API: {api['requests']} request, p95 {api['p95_latency'] * 1000:.0f} ms{circuit}\n"
+            f"Worker: {sum(pool['running_by_priority'].values())}/{pool['workers']} đang chạy, "
+            f"{pool['queued']} việc chờ, bỏ {pool['dropped']} · chờ p95 (tra từ): {user_wait:.0f} ms")
+
+def open_diagnostics_window():
+    existing = getattr(root, "_diagnostics_win", None)
+    if existing is not None and existing.winfo_exists():
+        existing.lift()
+        return
+
+    win = tk.Toplevel(root)
+    root._diagnostics_win = win
+    win.title("📊 Chẩn đoán hiệu năng")
+    win.geometry(f"{scale(760, scale_factor)}x{scale(520, scale_factor)}")
+    win.configure(bg="#fde4ec")
+    win.protocol("WM_DELETE_WINDOW", lambda: close_with_animation(win))
+
+    summary = tk.Label(win, font=(BASE_FONT, scale(10, scale_factor)), bg="#fde4ec", fg="#880e4f",
+                       justify="left", anchor="w")
+    summary.pack(fill="x", padx=scale(15, scale_factor), pady=(scale(10, scale_factor), 0))
+
+    tk.Label(win, text="Lượt tra gần đây (ms)", font=(BASE_FONT, scale(11, scale_factor), "bold"),
+             bg="#fde4ec", fg="#ad1457", anchor="w").pack(fill="x", padx=scale(15, scale_factor), pady=(scale(8, scale_factor), 0))
+    recent = ttk.Treeview(win, columns=("time", "kind", "word", "total", "breakdown"), show="headings", height=10)
+    for col, label, width in (("time", "Lúc", 70), ("kind", "Loại", 70), ("word", "Từ", 110),
+                              ("total", "Tổng", 60), ("breakdown", "Từng giai đoạn", 420)):
+        recent.heading(col, text=label)
+        recent.column(col, width=scale(width, scale_factor), anchor="w", stretch=(col == "breakdown"))
+    recent.pack(fill="both", expand=True, padx=scale(15, scale_factor))
+
+    tk.Label(win, text="Theo giai đoạn (các mẫu gần nhất)", font=(BASE_FONT, scale(11, scale_factor), "bold"),
+             bg="#fde4ec", fg="#ad1457", anchor="w").pack(fill="x", padx=scale(15, scale_factor), pady=(scale(8, scale_factor), 0))
+    stages = ttk.Treeview(win, columns=("stage", "count", "p50", "p95"), show="headings", height=8)
+    for col, label, width in (("stage", "Giai đoạn", 200), ("count", "Số lần", 80),
+                              ("p50", "p50 (ms)", 100), ("p95", "p95 (ms)", 100)):
+        stages.heading(col, text=label)
+        stages.column(col, width=scale(width, scale_factor), anchor="w")
+    stages.pack(fill="x", padx=scale(15, scale_factor))
+
+    def export_trace():
+        path = filedialog.asksaveasfilename(parent=win, defaultextension=".jsonl",
+                                            filetypes=[("JSON lines", "*.jsonl"), ("Tất cả", "*.*")])
+        if not path:
+            return
+        try:
+            count = tracer.export_jsonl(path)
+        except OSError as e:
+            messagebox.showerror("Lỗi", f"Không xuất được trace:\n{e}", parent=win)
+            return
+        messagebox.showinfo("Thông báo", f"Đã xuất {count} lượt tra ra {path}", parent=win)
+
+    export_btn = tk.Button(win, text="💾 Xuất trace (JSONL)", command=export_trace,
+                           font=(BASE_FONT, scale(10, scale_factor), "bold"), bg="#f8bbd0", fg="#880e4f",
+                           relief="flat", bd=0, padx=scale(12, scale_factor), pady=scale(5, scale_factor), cursor="hand2")
+    export_btn.pack(pady=scale(10, scale_factor))
+    add_hover_effect(export_btn, "#f8bbd0", "#f48fb1")
+
+    def refresh():
+        if not win.winfo_exists():
+            return
+        summary.config(text=cache_summary())
+        recent.delete(*recent.get_children())
+        for trace in reversed(tracer.recent_traces()):
+            recent.insert("", tk.END, values=(
+                time.strftime("%H:%M:%S", time.localtime(trace.started)),
+                trace.name,
+                trace.attrs.get("word", ""),
+                f"{trace.total * 1000:.0f}",
+                format_breakdown(trace.breakdown()),
+            ))
+        stages.delete(*stages.get_children())
+        stats = tracer.stage_stats()
+        for stage in [s for s in STAGE_ORDER if s in stats] + sorted(s for s in stats if s not in STAGE_ORDER):
+            st = stats[stage]
+            stages.insert("", tk.END, values=(stage, st["count"], f"{st['p50_ms']:.1f}", f"{st['p95_ms']:.1f}"))
+        win.after(DIAGNOSTICS_REFRESH_MS, refresh)
+
+    refresh()
+
+
+# Lệnh không cần giao diện (warm / batch / serve) được chuyển sang uk_core
+if __name__ == "__main__" and sys.argv[1:2] and sys.argv[1] in COMMANDS:
+    sys.exit(core_main(sys.argv[1:]))
+
+# Dùng server tra từ chung trong mạng LAN: UK_DICT_SERVER=http://<ip>:8765 python uk_dict.py
+if os.environ.get("UK_DICT_SERVER"):
+    use_lookup_server(os.environ["UK_DICT_SERVER"])
+
 # ====== UI SETUP ======
 # ====== INITIALIZE ROOT FIRST TO DETECT SCREEN SIZE ======
 root = tk.Tk()
@@ -1103,7 +1702,7 @@ frame.pack(pady=scale(10, scale_factor))
 entry = tk.Entry(frame, width=45, font=(BASE_FONT, scale(13, scale_factor)), relief="flat", bg="#fff0f6",
                  highlightthickness=2, highlightbackground="#f8bbd0", highlightcolor="#f48fb1")
 entry.pack(side=tk.LEFT, padx=scale(5, scale_factor), ipady=scale(6, scale_factor))
-entry.bind("<Return>", lambda event: lookup_meaning())
+root.bind("<F12>", lambda event: open_diagnostics_window())
 
 
 # Placeholder setup
@@ -1128,6 +1727,105 @@ entry.bind("<FocusIn>", clear_placeholder)
 entry.bind("<FocusOut>", restore_placeholder)
 set_placeholder()
 
+# ====== AUTOCOMPLETE DROPDOWN (gợi ý ngay dưới ô nhập, không cần gọi API) ======
+AUTOCOMPLETE_DEBOUNCE_MS = 60   # chờ người dùng ngừng gõ chừng này rồi mới tìm gợi ý
+AUTOCOMPLETE_ROWS = 6
+LOOKUP_DEBOUNCE_MS = 150        # Enter liên tục trong khoảng này chỉ tạo một lượt tra
+
+suggestion_box = tk.Listbox(root, height=AUTOCOMPLETE_ROWS, font=(BASE_FONT, scale(12, scale_factor)),
+                            relief="flat", bg="#fff0f6", fg="#880e4f", selectbackground="#f48fb1",
+                            selectforeground="white", highlightthickness=1, highlightbackground="#f8bbd0",
+                            activestyle="none", exportselection=False)
+_autocomplete_job = None
+_lookup_job = None
+
+def schedule_lookup():
+    """Tra nghĩa từ ô nhập sau LOOKUP_DEBOUNCE_MS; lần nhấn sau thay thế lần nhấn trước chưa chạy."""
+    global _lookup_job
+    if _lookup_job is not None:
+        root.after_cancel(_lookup_job)
+    _lookup_job = root.after(LOOKUP_DEBOUNCE_MS, run_scheduled_lookup)
+
+def run_scheduled_lookup():
+    global _lookup_job
+    _lookup_job = None
+    lookup_meaning()
+
+def hide_suggestions(event=None):
+    suggestion_box.place_forget()
+
+def show_suggestions(words):
+    suggestion_box.delete(0, tk.END)
+    for word in words:
+        suggestion_box.insert(tk.END, word)
+    suggestion_box.config(height=min(len(words), AUTOCOMPLETE_ROWS))
+    suggestion_box.place(in_=entry, relx=0, rely=1, relwidth=1)
+    suggestion_box.lift()
+
+def update_suggestions():
+    global _autocomplete_job
+    _autocomplete_job = None
+    text = entry.get().strip()
+    if not text or text == placeholder_text or root.focus_get() is not entry:
+        hide_suggestions()
+        return
+    words = get_word_index().suggest(text)
+    if not words or words == [normalize_word(text)]:
+        hide_suggestions()
+        return
+    show_suggestions(words)
+
+def on_entry_key(event):
+    global _autocomplete_job
+    if event.keysym in ("Up", "Down", "Return", "KP_Enter", "Escape"):
+        return
+    if _autocomplete_job is not None:
+        root.after_cancel(_autocomplete_job)
+    _autocomplete_job = root.after(AUTOCOMPLETE_DEBOUNCE_MS, update_suggestions)
+
+def move_suggestion(step):
+    if not suggestion_box.winfo_ismapped():
+        return None
+    size = suggestion_box.size()
+    current = suggestion_box.curselection()
+    i = (current[0] + step) % size if current else (0 if step > 0 else size - 1)
+    suggestion_box.selection_clear(0, tk.END)
+    suggestion_box.selection_set(i)
+    suggestion_box.see(i)
+    return "break"
+
+def accept_suggestion(event=None):
+    current = suggestion_box.curselection()
+    if not current:
+        return
+    word = suggestion_box.get(current[0])
+    entry.delete(0, tk.END)
+    entry.insert(0, word)
+    entry.config(fg=default_text_color)
+    entry.focus_set()
+    hide_suggestions()
+    lookup_meaning()
+
+def on_entry_return(event):
+    if suggestion_box.winfo_ismapped() and suggestion_box.curselection():
+        accept_suggestion()
+    else:
+        hide_suggestions()
+        schedule_lookup()
+    return "break"
+
+def hide_suggestions_if_unfocused():
+    if root.focus_get() not in (entry, suggestion_box):
+        hide_suggestions()
+
+entry.bind("<KeyRelease>", on_entry_key)
+entry.bind("<Down>", lambda event: move_suggestion(1))
+entry.bind("<Up>", lambda event: move_suggestion(-1))
+entry.bind("<Escape>", hide_suggestions)
+entry.bind("<Return>", on_entry_return)
+entry.bind("<FocusOut>", lambda event: root.after(150, hide_suggestions_if_unfocused), add="+")
+suggestion_box.bind("<ButtonRelease-1>", accept_suggestion)
+
 # Buttons
 button_frame = tk.Frame(root, bg="#fde4ec")
 button_frame.pack(pady=scale(5, scale_factor))
@@ -1176,4 +1874,16 @@ result_text.tag_configure("vi_style", foreground="#00897b")
 result_text.tag_configure("syn_style", foreground="#1565c0")
 result_text.tag_configure("ant_style", foreground="#d84315")
 
+typing_renderer = TypingRenderer(result_text)
+
+root.after_idle(start_background_loading)
+
+# Đo thời gian tới khung hình đầu tiên (dùng bởi benchmarks/bench_startup.py)
+if os.environ.get("UK_DICT_STARTUP_PROBE"):
+    def _report_first_frame():
+        root.update()
+        print(f"FIRST_FRAME {time.perf_counter() - _STARTUP_T0:.4f}", flush=True)
+        root.destroy()
+    root.after_idle(_report_first_frame)
+
 root.mainloop()